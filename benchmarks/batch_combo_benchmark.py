@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Measure the throughput of masses_to_combos for growing numbers of workers.
+
+Every worker memory-maps the combo table cached on disk and gathers the combos
+of its chunks, so the scaling is bound by the number of cores and the memory
+bandwidth of the machine.
+
+Usage:
+
+    python benchmarks/batch_combo_benchmark.py [n_masses]
+
+"""
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+
+from unimod_mapper import UnimodMapper
+
+
+def main(n_masses=2000000):
+    logger.remove()
+    rng = np.random.default_rng(0)
+    um = UnimodMapper()
+    masses = rng.uniform(-100, 600, n_masses)
+    um.masses_to_combos(masses[:1])
+    for processes in [1, 2, 4, 8]:
+        start = time.perf_counter()
+        offsets, _, _ = um.masses_to_combos(masses, decimals=2, processes=processes)
+        duration = time.perf_counter() - start
+        print(
+            f"{processes} workers   {n_masses} masses   {offsets[-1]:9d} combos   "
+            f"{duration:6.3f} s   {n_masses / duration / 1e6:6.2f} M masses/s"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
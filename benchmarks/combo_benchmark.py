@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Measure the per-query cost of mass_to_combos for growing combo tables.
+
+The table is built once per size, afterwards every query is a binary
+search on the sorted combo masses, so the per-query cost should stay flat
+while the table grows quadratically with the number of distinct mods.
+
+Usage:
+
+    python benchmarks/combo_benchmark.py [n_queries]
+
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from unimod_mapper import UnimodMapper
+
+
+def main(n_queries=1000):
+    logger.remove()
+    rng = np.random.default_rng(0)
+    for n_mods in [100, 300, 1000, 2000]:
+        um = UnimodMapper()
+        um._df = pd.DataFrame(
+            {
+                "mono_mass": rng.uniform(-100, 500, n_mods),
+                "Name": [f"mod_{i}" for i in range(n_mods)],
+            }
+        )
+        start = time.perf_counter()
+        um.mass_to_combos(0)
+        build = time.perf_counter() - start
+
+        queries = rng.uniform(-200, 1000, n_queries)
+        start = time.perf_counter()
+        for mass in queries:
+            um.mass_to_combos(mass, decimals=2)
+        per_query = (time.perf_counter() - start) / n_queries
+        print(
+            f"{n_mods:5d} mods {len(um._mass_combos(2)['mass']):9d} combos   "
+            f"build: {build:8.3f} s   per query: {per_query * 1e6:8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Compare per-lookup latency of the indexed name_to_* / id_to_* methods
+with the previous `df.query` based implementation.
+
+Usage:
+
+    python benchmarks/lookup_benchmark.py [n_lookups]
+
+"""
+import sys
+import time
+
+from loguru import logger
+
+from unimod_mapper import UnimodMapper
+
+QUERIES = {
+    "name_to_mass": ("Name", "mono_mass"),
+    "name_to_composition": ("Name", "elements"),
+    "name_to_id": ("Name", "Accession"),
+    "id_to_mass": ("Accession", "mono_mass"),
+    "id_to_composition": ("Accession", "elements"),
+    "id_to_name": ("Accession", "Name"),
+}
+
+
+def per_call(function, keys):
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main(n_lookups=200):
+    logger.remove()
+    um = UnimodMapper()
+    df = um.df
+    for method, (key_column, column) in QUERIES.items():
+        keys = df[key_column].dropna().unique()[:n_lookups]
+
+        def query(key):
+            return df.query(f"`{key_column}` == @key")[column].to_list()
+
+        indexed = getattr(um, method)
+        for key in keys:
+            assert indexed(key) == query(key), (method, key)
+        before = per_call(query, keys)
+        after = per_call(indexed, keys)
+        print(
+            f"{method:20s} query: {before * 1e6:10.1f} us   "
+            f"indexed: {after * 1e6:8.1f} us   ({before / after:6.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
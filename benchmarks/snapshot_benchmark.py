@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Compare the start up time of a cold UnimodMapper (parsing unimod.xml)
+with one loading the parsed table from its binary snapshot.
+
+Usage:
+
+    python benchmarks/snapshot_benchmark.py [repeats]
+
+"""
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from unimod_mapper import UnimodMapper
+
+
+def time_df_access(repeats, **kwargs):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        UnimodMapper(**kwargs).df
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(repeats=5):
+    logger.remove()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = time_df_access(repeats, use_cache=False)
+        # first access writes the snapshot
+        UnimodMapper(cache_dir=cache_dir).df
+        snapshot = time_df_access(repeats, cache_dir=cache_dir)
+    print(f"cold start:     {cold * 1000:8.2f} ms")
+    print(f"snapshot start: {snapshot * 1000:8.2f} ms")
+    print(f"speed up:       {cold / snapshot:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
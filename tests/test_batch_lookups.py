@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import numpy as np
+import pandas as pd
+import pytest
+
+from unimod_mapper import UnimodMapper
+
+MASSES = [15.994915, 42.010565, 1000000.0, np.nan, 79.966331, 15.994915]
+
+
+def test_masses_to_ids_csr_matches_single_lookups():
+    um = UnimodMapper(use_cache=False)
+    offsets, ids = um.masses_to_ids(np.array(MASSES), decimals=4)
+    assert len(offsets) == len(MASSES) + 1
+    for i, mass in enumerate(MASSES):
+        assert list(ids[offsets[i] : offsets[i + 1]]) == list(
+            um.mass_to_ids(mass, decimals=4)
+        )
+
+
+def test_masses_to_names_and_compositions():
+    um = UnimodMapper(use_cache=False)
+    offsets, names = um.masses_to_names(pd.Series(MASSES))
+    offsets_c, compositions = um.masses_to_compositions(MASSES)
+    for i, mass in enumerate(MASSES):
+        assert list(names[offsets[i] : offsets[i + 1]]) == list(um.mass_to_names(mass))
+        assert list(
+            compositions[offsets_c[i] : offsets_c[i + 1]]
+        ) == um.mass_to_compositions(mass)
+
+
+def test_masses_to_ids_as_frame():
+    um = UnimodMapper(use_cache=False)
+    df = um.masses_to_ids(MASSES, as_frame=True)
+    assert list(df.columns) == ["input_index", "Accession"]
+    oxidation = df.query("input_index == 0")["Accession"].to_list()
+    assert "35" in oxidation
+    assert df.query("input_index == 5")["Accession"].to_list() == oxidation
+    assert df.query("input_index in [2, 3]").empty
+
+
+def test_masses_to_ids_isotope_errors():
+    um = UnimodMapper(use_cache=False)
+    masses = [15.994915, 15.994915 + 1.003355, np.nan]
+    offsets, ids, errors = um.masses_to_ids(masses, isotope_errors=range(-1, 3))
+    assert len(offsets) == len(masses) + 1
+    assert "35" in ids[offsets[0] : offsets[1]][errors[offsets[0] : offsets[1]] == 0]
+    assert "35" in ids[offsets[1] : offsets[2]][errors[offsets[1] : offsets[2]] == 1]
+    assert offsets[2] == offsets[3]
+    for i, mass in enumerate(masses[:2]):
+        for k in range(-1, 3):
+            window = errors[offsets[i] : offsets[i + 1]] == k
+            assert list(ids[offsets[i] : offsets[i + 1]][window]) == list(
+                um.mass_to_ids(mass - k * 1.003355)
+            )
+
+    df = um.masses_to_names(masses, isotope_errors=[0, 1], as_frame=True)
+    assert list(df.columns) == ["input_index", "Name", "isotope_error"]
+    assert (
+        "Oxidation"
+        in df.query("input_index == 1 and isotope_error == 1")["Name"].to_list()
+    )
+    assert (
+        "Oxidation"
+        not in df.query("input_index == 1 and isotope_error == 0")["Name"].to_list()
+    )
+
+
+def test_masses_to_combos_isotope_errors():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    offsets, combo_masses, members, errors = um.masses_to_combos(
+        [2.1], decimals=1, isotope_errors=[0, 1]
+    )
+    assert errors.tolist() == [0, 1]
+    assert np.round(combo_masses, 1).tolist() == [2.1, 1.1]
+    assert offsets.tolist() == [0, 2]
+
+
+def test_annotate_dataframe():
+    um = UnimodMapper(use_cache=False)
+    psms = pd.DataFrame(
+        {"delta_mass": [15.995, np.nan, 1000000.0, 79.9663]}, index=["a", "b", "c", "d"]
+    )
+    annotated = um.annotate_dataframe(psms, tolerance=0.001)
+    assert list(annotated.columns) == [
+        "psm_index",
+        "Accession",
+        "Name",
+        "mono_mass",
+        "error",
+    ]
+    assert set(annotated["psm_index"]) == {"a", "d"}
+    for label in ["a", "d"]:
+        matches = annotated.query("psm_index == @label")
+        assert matches["Accession"].to_list() == list(
+            um.mass_to_ids(
+                psms.loc[label, "delta_mass"], tolerance=0.001, tolerance_unit="Da"
+            )
+        )
+        assert np.allclose(
+            matches["error"], psms.loc[label, "delta_mass"] - matches["mono_mass"]
+        )
+    assert "Oxidation" in annotated.query("psm_index == 'a'")["Name"].to_list()
+
+
+def test_neutral_loss_matches():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {
+            "Accession": ["1", "1", "1", "2", "3"],
+            "Name": ["a", "a", "a", "b", "c"],
+            "Site": ["S", "T", "Y", "K", "K"],
+            "mono_mass": [80.0, 80.0, 80.0, 42.0, -18.0],
+            "neutral_losses": [98.0, 98.0, 0.0, 0.0, 0.0],
+        }
+    )
+    matches = um.mass_to_matches(-18.0, decimals=2)
+    assert list(matches.columns) == [
+        "Accession",
+        "Name",
+        "mono_mass",
+        "neutral_loss",
+        "form",
+        "error",
+    ]
+    assert matches["Name"].to_list() == ["c", "a"]
+    assert matches["form"].to_list() == ["intact", "neutral_loss"]
+    assert matches["neutral_loss"].to_list() == [0.0, 98.0]
+    assert um.mass_to_matches(-18.0, decimals=2, neutral_losses=False)[
+        "Name"
+    ].to_list() == ["c"]
+    assert um.mass_to_matches(80.0, decimals=2)["form"].to_list() == ["intact"]
+
+    psms = pd.DataFrame({"delta_mass": [-18.001, 42.0]})
+    annotated = um.annotate_dataframe(psms, neutral_losses=True)
+    assert annotated["psm_index"].to_list() == [0, 0, 1]
+    assert annotated["form"].to_list() == ["intact", "neutral_loss", "intact"]
+    assert np.allclose(annotated["error"], [-0.001, -0.001, 0])
+
+
+def test_matches_without_loss_and_site_columns():
+    um = UnimodMapper(use_cache=False)
+    # like the tables of read_mapped_mods_as_df
+    um._df = pd.DataFrame(
+        {
+            "Accession": ["1", "2"],
+            "Name": ["a", "b"],
+            "mono_mass": [80.0, 42.0],
+            "neutral_loss": [98.0, 0.0],
+        }
+    )
+    matches = um.mass_to_matches(80.0, decimals=2)
+    assert matches["Name"].to_list() == ["a"]
+    assert matches["form"].to_list() == ["intact"]
+    assert matches["neutral_loss"].to_list() == [0.0]
+    assert um.mass_to_matches(-18.0, decimals=2).empty
+    with pytest.raises(ValueError, match="Site"):
+        um.mass_to_ids(80.0, site="S")
+    with pytest.raises(ValueError, match="Classification"):
+        um.mass_to_combos(122.0, decimals=0, classification="PTM")
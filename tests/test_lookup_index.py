@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import numpy as np
+import pandas as pd
+import pytest
+
+from unimod_mapper import UnimodMapper
+
+
+def test_indexed_lookups_match_query():
+    um = UnimodMapper(use_cache=False)
+    for name in ["Acetyl", "Oxidation", "Phospho", "not a mod"]:
+        rows = um.df.query("`Name` == @name")
+        assert um.name_to_mass(name) == rows["mono_mass"].to_list()
+        assert um.name_to_composition(name) == rows["elements"].to_list()
+        assert um.name_to_id(name) == rows["Accession"].to_list()
+        assert (
+            um.name_to_neutral_loss(name)
+            == rows[["Site", "neutral_losses"]].to_numpy().tolist()
+        )
+    for id in ["1", "35", "21", "987654321", 35]:
+        rows = um.df.query("`Accession` == @id")
+        assert um.id_to_mass(id) == rows["mono_mass"].to_list()
+        assert um.id_to_composition(id) == rows["elements"].to_list()
+        assert um.id_to_name(id) == rows["Name"].to_list()
+
+
+def test_index_invalidated_with_new_df():
+    um = UnimodMapper(use_cache=False)
+    assert um.name_to_id("Oxidation") != []
+    um._df = pd.DataFrame(
+        [{"Name": "Oxidation", "Accession": "u1", "mono_mass": 1.0, "elements": {}}]
+    )
+    assert um.name_to_id("Oxidation") == ["u1"]
+    assert um.id_to_mass("u1") == [1.0]
+
+
+def test_mass_lookups_match_query():
+    um = UnimodMapper(use_cache=False)
+    for mass in [15.994915, 42.010565, 79.966331, 304.207146, 0.984016, -18.010565]:
+        for decimals in [0, 2, 4, 5]:
+            lower_mass, upper_mass = um._determine_mass_range(mass, decimals=decimals)
+            rows = um.df.query("@lower_mass <= `mono_mass` <= @upper_mass")
+            assert list(um.mass_to_ids(mass, decimals=decimals)) == list(
+                rows["Accession"].unique()
+            )
+            assert list(um.mass_to_names(mass, decimals=decimals)) == list(
+                rows["Name"].unique()
+            )
+            assert (
+                um.mass_to_compositions(mass, decimals=decimals)
+                == rows["elements"].tolist()
+            )
+
+
+def test_mass_lookups_window_bounds():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 0.95, "Name": "a", "Accession": "1", "elements": {}},
+            {"mono_mass": 1.04, "Name": "b", "Accession": "2", "elements": {}},
+            {"mono_mass": 1.05, "Name": "c", "Accession": "3", "elements": {}},
+            {"mono_mass": 0.94, "Name": "d", "Accession": "4", "elements": {}},
+        ]
+    )
+    assert list(um.mass_to_names(1, decimals=1)) == ["a", "b"]
+    assert list(um.mass_to_ids(1, decimals=0)) == ["1", "2", "3", "4"]
+
+
+def test_composition_lookups_use_hill_notation():
+    um = UnimodMapper(use_cache=False)
+    assert um.df.loc[0, "hill_notation"] == um._hill_notation(um.df.loc[0, "elements"])
+    composition = {"O": 1, "C": 1}
+    rows = um.df.query("`elements` == @composition")
+    assert um.composition_to_names(composition) == list(rows["Name"].unique())
+    assert um.composition_to_ids({"C": 1, "O": 1}) == list(rows["Accession"].unique())
+    assert um.composition_to_mass({"O": 1}) == 15.994915
+    assert um.composition_to_mass({"O": 1111}) is None
+
+
+def test_composition_lookups_without_hill_notation_column():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"Name": "a", "Accession": "1", "mono_mass": 1.0, "elements": {"O": 1}},
+            {"Name": "b", "Accession": "2", "mono_mass": 2.0, "elements": None},
+        ]
+    )
+    assert um.composition_to_names({"O": 1}) == ["a"]
+    assert um.composition_to_ids({"C": 1}) == []
+
+
+def test_mass_lookups_with_tolerance():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {
+            "mono_mass": [99.9990, 100.0, 100.0005, 100.002],
+            "Name": ["a", "b", "c", "d"],
+            "Accession": ["1", "2", "3", "4"],
+            "elements": [{"C": 1}, {"C": 2}, {"C": 3}, {"C": 4}],
+        }
+    )
+    assert list(um.mass_to_names(100, tolerance=5)) == ["b", "c"]
+    assert list(um.mass_to_names(100, tolerance=10)) == ["a", "b", "c"]
+    assert list(um.mass_to_ids(100, tolerance=(0, 20))) == ["2", "3", "4"]
+    assert um.mass_to_compositions(100, tolerance=0.0011, tolerance_unit="Da") == [
+        {"C": 1},
+        {"C": 2},
+        {"C": 3},
+    ]
+    assert um.mass_to_combos(200, tolerance=1) == [(200.0, ["b", "b"])]
+    offsets, names = um.masses_to_names([100, 100.002], tolerance=(0, 5))
+    assert offsets.tolist() == [0, 2, 3]
+    assert names.tolist() == ["b", "c", "d"]
+    with pytest.raises(ValueError):
+        um.mass_to_ids(100, tolerance=1, tolerance_unit="mmu")
+
+
+def test_mass_lookups_by_site_and_classification():
+    um = UnimodMapper(use_cache=False)
+    df = um.df
+    for mass, site, classification in [
+        (42.010565, "K", None),
+        (42.010565, "N-term", "Post-translational"),
+        (79.966331, ["S", "T", "Y"], "Post-translational"),
+        (15.994915, ["C", "G"], ["Pre-translational", "Post-translational"]),
+    ]:
+        sites = [site] if isinstance(site, str) else site
+        lower_mass, upper_mass = um._determine_mass_range(mass)
+        expected = df[
+            (df["mono_mass"] >= lower_mass)
+            & (df["mono_mass"] <= upper_mass)
+            & df["Site"].isin(sites)
+        ]
+        if classification is not None:
+            classifications = (
+                [classification] if isinstance(classification, str) else classification
+            )
+            expected = expected[expected["Classification"].isin(classifications)]
+        assert len(expected) > 0
+        assert list(
+            um.mass_to_ids(mass, site=site, classification=classification)
+        ) == list(expected["Accession"].unique())
+        assert (
+            um.mass_to_compositions(mass, site=site, classification=classification)
+            == expected["elements"].to_list()
+        )
+    assert list(um.mass_to_names(15.994915, site="N-term", classification="Other")) == []
+
+
+def test_nearest_mods():
+    um = UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {
+            "mono_mass": [1.0, 1.0, 2.0, 4.0, np.nan, 7.0],
+            "Name": ["a", "a", "b", "c", "d", "e"],
+            "Accession": ["1", "1", "2", "3", "4", "5"],
+        }
+    )
+    nearest = um.nearest_mods(3.9, k=2)
+    assert nearest["Name"].to_list() == ["c", "b"]
+    assert np.allclose(nearest["error"], [-0.1, 1.9])
+    assert um.nearest_mods(3.9, k=3, max_error=2)["Name"].to_list() == ["c", "b"]
+    assert um.nearest_mods(100, k=10)["Name"].to_list() == ["e", "c", "b", "a"]
+
+    nearest = um.masses_to_nearest_mods([0, np.nan, 6], k=1)
+    assert nearest["input_index"].to_list() == [0, 2]
+    assert nearest["Name"].to_list() == ["a", "e"]
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # encoding: utf-8
 from pathlib import Path
+import numpy as np
+import pytest
 import pandas as pd
 
 import unimod_mapper
@@ -104,3 +106,335 @@ def test_mass_to_combos_1B_decimal():
     #     (1.04, ["0.45", "0.59"]),
     #     (1.04, ["0.59", "0.45"]),
     # ]
+
+
+def test_mass_to_combos_matches_sorted_pairs():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 0.5, "Name": "b"},
+            {"mono_mass": 0.5, "Name": "a"},
+            {"mono_mass": 0.25, "Name": "c"},
+            {"mono_mass": 0.75, "Name": "d"},
+        ]
+    )
+    combo_list = um.mass_to_combos(1, decimals=0)
+    assert combo_list == [
+        (0.5, ["c", "c"]),
+        (0.75, ["a", "c"]),
+        (0.75, ["b", "c"]),
+        (1.0, ["a", "a"]),
+        (1.0, ["b", "a"]),
+        (1.0, ["b", "b"]),
+        (1.0, ["c", "d"]),
+        (1.25, ["a", "d"]),
+        (1.25, ["b", "d"]),
+    ]
+
+
+def test_mass_to_combos_honors_n():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 0.25, "Name": "a"},
+            {"mono_mass": 0.5, "Name": "b"},
+            {"mono_mass": 0.75, "Name": "c"},
+        ]
+    )
+    assert um.mass_to_combos(1, n=3, decimals=1) == [
+        (1.0, ["a", "a", "b"]),
+    ]
+    assert um.mass_to_combos(1.5, n=3, decimals=1) == [
+        (1.5, ["a", "b", "c"]),
+        (1.5, ["b", "b", "b"]),
+    ]
+    assert um.mass_to_combos(0.75, n=1, decimals=1) == [(0.75, ["c"])]
+    assert len(um.mass_to_combos(1, n=2, decimals=1)) == 2
+
+
+def test_mass_to_combos_on_demand():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 0.75, "Name": "c"},
+            {"mono_mass": 0.25, "Name": "a"},
+            {"mono_mass": 0.5, "Name": "b"},
+        ]
+    )
+    combos = um.mass_to_combos(1.5, n=3, decimals=1, on_demand=True)
+    assert iter(combos) is combos
+    # names are listed in table order, like for precomputed combos
+    assert sorted(combos) == [
+        (1.5, ["b", "b", "b"]),
+        (1.5, ["c", "a", "b"]),
+    ]
+    assert sorted(um.mass_to_combos(1.5, n=2, decimals=1, on_demand=True)) == [
+        (1.5, ["c", "c"])
+    ]
+    assert list(um.mass_to_combos(0.5, n=1, decimals=1, on_demand=True)) == [
+        (0.5, ["b"])
+    ]
+    assert len(um._combos) == 0
+    with pytest.raises(ValueError):
+        um.mass_to_combos(1.5, decimals=1, on_demand=True, combo_mass_range=(1, 2))
+
+
+def test_mass_to_combos_return_indices():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 0.25, "Name": "a"},
+            {"mono_mass": 0.5, "Name": "b"},
+            {"mono_mass": 0.75, "Name": "c"},
+        ]
+    )
+    masses, members = um.mass_to_combos(1, decimals=1, return_indices=True)
+    assert masses.dtype == np.float64
+    assert members.dtype == np.int32
+    assert masses.tolist() == [1.0, 1.0]
+    names = um.combo_mods["Name"].to_numpy()[members].tolist()
+    assert names == [["a", "c"], ["b", "b"]]
+    assert list(zip(masses, names)) == um.mass_to_combos(1, decimals=1)
+
+    chunks = um.mass_to_combos(1, n=3, decimals=1, on_demand=True, return_indices=True)
+    members = [m for _, chunk_members in chunks for m in chunk_members.tolist()]
+    assert sorted(members) == [[0, 0, 1]]
+
+
+def test_mass_to_peptide_combos():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 1, "Name": "a", "Site": "K", "Classification": "PTM"},
+            {"mono_mass": 1, "Name": "a", "Site": "R", "Classification": "Other"},
+            {"mono_mass": 2, "Name": "b", "Site": "N-term", "Classification": "PTM"},
+            {"mono_mass": 3, "Name": "c", "Site": "M", "Classification": "PTM"},
+        ]
+    )
+    assert um.mass_to_peptide_combos(3, "PEPKR", decimals=0) == [
+        (3.0, ["a", "b"]),
+    ]
+    assert um.mass_to_peptide_combos(2, "PEPKR", decimals=0) == [
+        (2.0, ["a", "a"]),
+        (2.0, ["b"]),
+    ]
+    assert um.mass_to_peptide_combos(2, "PEPKR", decimals=0, n_term=False) == [
+        (2.0, ["a", "a"]),
+    ]
+    assert um.mass_to_peptide_combos(2, "PEPKR", decimals=0, classification=["PTM"]) == [
+        (2.0, ["b"])
+    ]
+    assert um.mass_to_peptide_combos(2, "PEPKR", decimals=0, classification="PTM") == [
+        (2.0, ["b"])
+    ]
+    assert um.mass_to_peptide_combos(3, "PEPMK", n=3, decimals=0) == [
+        (3.0, ["a", "b"]),
+        (3.0, ["c"]),
+    ]
+    assert um.mass_to_peptide_combos(6, "MPEPMK", n=3, decimals=0) == [
+        (6.0, ["a", "b", "c"]),
+        (6.0, ["c", "c"]),
+    ]
+    assert um.mass_to_peptide_combos(9, "MPEPMK", n=3, decimals=0) == []
+
+
+def test_masses_to_combos_matches_single_lookups():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    masses = [1.1, np.nan, 2.5, 100, 1.8, 0.9]
+    offsets, combo_masses, members = um.masses_to_combos(masses, decimals=1)
+    assert len(offsets) == len(masses) + 1
+    for i, mass in enumerate(masses):
+        assert um._combos_to_tuples(
+            combo_masses[offsets[i] : offsets[i + 1]],
+            members[offsets[i] : offsets[i + 1]],
+        ) == um.mass_to_combos(mass, decimals=1)
+
+    df = um.masses_to_combos(
+        masses, decimals=1, as_frame=True, processes=2, chunk_size=2
+    )
+    assert list(df.columns) == ["input_index", "mono_mass", "Names"]
+    assert (
+        df["input_index"].to_list()
+        == np.repeat(np.arange(len(masses)), np.diff(offsets)).tolist()
+    )
+    assert df.query("input_index == 4")["Names"].to_list() == [
+        ["a", "e"],
+        ["c", "d"],
+    ]
+
+
+def test_mass_to_combos_with_composition():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 1, "Name": "a", "elements": {"H": 2, "O": -1}},
+            {"mono_mass": 2, "Name": "b", "elements": {"C": 1, "O": 1}},
+        ]
+    )
+    assert um.mass_to_combos(3, decimals=0, with_composition=True) == [
+        (3.0, ["a", "b"], {"C": 1, "H": 2}),
+    ]
+    masses, members, compositions = um.mass_to_combos(
+        2, decimals=0, return_indices=True, with_composition=True
+    )
+    assert list(compositions.columns) == ["C", "H", "O"]
+    assert compositions.to_numpy().tolist() == [[0, 4, -2]]
+    assert list(
+        um.mass_to_combos(2, decimals=0, on_demand=True, with_composition=True)
+    ) == [(2.0, ["a", "a"], {"H": 4, "O": -2})]
+
+
+def test_composition_to_combos():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 1, "Name": "a", "elements": {"H": 2, "O": -1}},
+            {"mono_mass": 2, "Name": "b", "elements": {"C": 1, "O": 1}},
+            {"mono_mass": 3, "Name": "c", "elements": {"C": 1, "H": 2}},
+            {"mono_mass": 4, "Name": "d", "elements": {"H": 4, "O": -2}},
+        ]
+    )
+    assert um.composition_to_combos({"C": 1, "H": 2}) == [
+        (3.0, ["c"]),
+        (3.0, ["a", "b"]),
+    ]
+    assert um.composition_to_combos({"H": 4, "O": -2, "N": 0}, n=3) == [
+        (4.0, ["d"]),
+        (2.0, ["a", "a"]),
+    ]
+    assert um.composition_to_combos({"C": 2, "H": 4}, n=4) == [
+        (6.0, ["c", "c"]),
+        (6.0, ["a", "b", "c"]),
+        (8.0, ["b", "b", "d"]),
+        (6.0, ["a", "a", "b", "b"]),
+    ]
+    assert um.composition_to_combos({"C": 1, "H": 2, "N": 1}) == []
+    for n in [0, 5]:
+        with pytest.raises(ValueError):
+            um.composition_to_combos({"C": 1, "H": 2}, n=n)
+
+
+def test_mass_to_difference_combos():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    combos = um.mass_to_difference_combos(0.7, decimals=1)
+    assert [names for _, names in combos] == [["e", "c"], ["d", "a"]]
+    assert [round(mass, 5) for mass, _ in combos] == [0.7, 0.7]
+    combos = um.mass_to_difference_combos(-0.3, decimals=1)
+    assert [names for _, names in combos] == [["a", "c"], ["d", "e"]]
+    differences, members = um.mass_to_difference_combos(
+        0, decimals=0, return_indices=True
+    )
+    assert len(differences) == 9
+    assert np.all((-0.5 <= differences) & (differences <= 0.4))
+    assert np.all(members[:, 0] != members[:, 1])
+
+
+def test_mass_to_combos_filtered():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        [
+            {"mono_mass": 1, "Name": "a", "Site": "K", "Classification": "PTM"},
+            {"mono_mass": 1, "Name": "a", "Site": "R", "Classification": "Label"},
+            {"mono_mass": 2, "Name": "b", "Site": "S", "Classification": "Label"},
+            {"mono_mass": 2, "Name": "c", "Site": "K", "Classification": "PTM"},
+            {"mono_mass": 3, "Name": "d", "Site": "R", "Classification": "PTM"},
+        ]
+    ).assign(**{"PSI-MS approved": [True, True, True, True, False]})
+    assert um.mass_to_combos(4, decimals=0) == [
+        (4.0, ["a", "d"]),
+        (4.0, ["b", "b"]),
+        (4.0, ["b", "c"]),
+        (4.0, ["c", "c"]),
+    ]
+    assert um.mass_to_combos(4, decimals=0, classification="PTM") == [
+        (4.0, ["a", "d"]),
+        (4.0, ["c", "c"]),
+    ]
+    assert um.mass_to_combos(
+        4, decimals=0, classification=["PTM"], site=["K", "S"], approved=True
+    ) == [(4.0, ["c", "c"])]
+    assert um.mass_to_combos(4, decimals=0, site="R", classification="Label") == []
+    assert um.mass_to_combos(4, decimals=0, mod_mass_range=(1.5, 2)) == [
+        (4.0, ["b", "b"]),
+        (4.0, ["b", "c"]),
+        (4.0, ["c", "c"]),
+    ]
+    assert (
+        list(um.mass_to_combos(4, n=3, decimals=0, on_demand=True, approved=False)) == []
+    )
+    assert len(um._combos) == 5
+
+
+def test_combo_cache_lru_and_invalidation():
+    um = unimod_mapper.UnimodMapper(use_cache=False, combo_cache_bytes=1000)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    # 15 pairs of (float64, 2 * int32) are 240 bytes, 35 triples 700 bytes
+    um.mass_to_combos(1, n=2, decimals=0)
+    um.mass_to_combos(2, n=2, decimals=0)
+    assert um.combo_cache_info["hits"] == 1
+    assert um.combo_cache_info["misses"] == 1
+    assert um.combo_cache_info["nbytes"] == 240
+
+    um.mass_to_combos(2, n=3, decimals=0, combo_mass_range=(0, 5))
+    assert um.combo_cache_info["entries"] == 2
+    um.mass_to_combos(2, n=2, decimals=0, site=None, mod_mass_range=(0, 1))
+    info = um.combo_cache_info
+    assert info["evictions"] == 1
+    assert info["nbytes"] <= info["max_bytes"]
+    # the pair table was used least recently
+    um.mass_to_combos(2, n=3, decimals=0, combo_mass_range=(0, 5))
+    assert um.combo_cache_info["hits"] == 2
+
+    um._df = pd.DataFrame({"mono_mass": [1.0], "Name": ["x"]})
+    assert um.mass_to_combos(2, n=3, decimals=0, combo_mass_range=(0, 5)) == []
+    assert um.mass_to_combos(2, n=2, decimals=0) == [(2.0, ["x", "x"])]
+    assert um.combo_cache_info["entries"] == 2
+
+
+def test_mass_to_combos_combo_mass_range():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    for n in [2, 3]:
+        full = um._generate_mass_combos(n=n)
+        limited = um._generate_mass_combos(n=n, combo_mass_range=(1.2, 2.1))
+        in_range = (1.2 <= full["mass"]) & (full["mass"] <= 2.1)
+        assert np.array_equal(limited["mass"], full["mass"][in_range])
+        assert np.array_equal(limited["members"], full["members"][in_range])
+    assert um.mass_to_combos(
+        1.8, decimals=1, combo_mass_range=(1, 2)
+    ) == um.mass_to_combos(1.8, decimals=1)
+    with pytest.raises(ValueError):
+        um.mass_to_combos(2.5, decimals=1, combo_mass_range=(1, 2))
+
+
+def test_longer_combos_not_precomputed():
+    um = unimod_mapper.UnimodMapper(use_cache=False)
+    um._df = pd.DataFrame(
+        {"mono_mass": [0.4, 0.5, 0.7, 1.1, 1.4], "Name": ["a", "b", "c", "d", "e"]}
+    )
+    full = um._generate_mass_combos(n=3)
+    combos = um.mass_to_combos(1.9, n=3, decimals=1, return_indices=True)
+    in_window = (1.85 <= full["mass"]) & (full["mass"] <= 1.94)
+    assert np.array_equal(combos[0], full["mass"][in_window])
+    assert np.array_equal(combos[1], full["members"][in_window])
+    assert um.combo_cache_info["entries"] == 0
+
+    with pytest.raises(ValueError, match="combo_mass_range"):
+        um.masses_to_combos([1.9], n=3, decimals=1)
+    offsets, combo_masses, members = um.masses_to_combos(
+        [1.9, 2.5], n=3, decimals=1, combo_mass_range=(1, 3)
+    )
+    assert np.array_equal(combo_masses[: offsets[1]], combos[0])
+    assert np.array_equal(members[: offsets[1]], combos[1])
+    with pytest.raises(ValueError):
+        um.masses_to_combos([1.9, 3.5], n=3, decimals=1, combo_mass_range=(1, 3))
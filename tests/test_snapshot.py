@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import unimod_mapper
+
+test_dir = Path(__file__).parent
+usermod_path = test_dir.joinpath("usermod.xml")
+
+
+def test_snapshot_is_written_and_loaded(tmp_path):
+    cache_dir = tmp_path / "cache"
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    df = um.df
+    assert len(list(cache_dir.glob("unimod_df_*.npz"))) == 1
+
+    um2 = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um2._build_df = None  # snapshot has to be used
+    pd.testing.assert_frame_equal(um2.df, df)
+
+
+def test_snapshot_rebuilt_on_xml_change(tmp_path):
+    cache_dir = tmp_path / "cache"
+    xml_path = tmp_path / "usermod.xml"
+    shutil.copy(usermod_path, xml_path)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    assert "Yadaylation" not in um.df["Name"].to_list()
+    um.mass_to_combos(100)
+    stale = list(cache_dir.glob("*"))
+    assert len(stale) == 3
+
+    content = xml_path.read_text().replace('title="PIAA"', 'title="Yadaylation"')
+    xml_path.write_text(content)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    assert "Yadaylation" in um.df["Name"].to_list()
+    # the snapshot and combo tables of the old file are removed
+    assert list(cache_dir.glob("*")) == [um._snapshot_path()]
+    assert all(path.exists() is False for path in stale)
+
+
+def test_configurations_share_cache_dir(tmp_path):
+    cache_dir = tmp_path / "cache"
+    xml_path = tmp_path / "usermod.xml"
+    shutil.copy(usermod_path, xml_path)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um.mass_to_combos(100)
+    kept = list(cache_dir.glob("*"))
+    assert len(kept) == 3
+
+    um2 = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um2.mass_to_combos(100)
+    assert len(list(cache_dir.glob("*"))) == 6
+    # only files of the same configuration are pruned
+    xml_path.write_text(xml_path.read_text().replace('title="PIAA"', 'title="X"'))
+    um3 = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    assert "X" in um3.df["Name"].to_list()
+    assert sorted(cache_dir.glob("*")) == sorted(kept + [um3._snapshot_path()])
+
+
+def test_snapshot_not_built_from_outdated_records(tmp_path):
+    cache_dir = tmp_path / "cache"
+    xml_path = tmp_path / "usermod.xml"
+    shutil.copy(usermod_path, xml_path)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    assert "PIAA" in [entry["unimodname"] for entry in um.data_list]
+
+    content = xml_path.read_text().replace('title="PIAA"', 'title="Yadaylation"')
+    xml_path.write_text(content)
+    assert "Yadaylation" in um.df["Name"].to_list()
+    um2 = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um2._build_df = None  # snapshot has to be used
+    assert "Yadaylation" in um2.df["Name"].to_list()
+
+
+def test_snapshot_not_written_for_files_changed_while_parsing(tmp_path):
+    cache_dir = tmp_path / "cache"
+    xml_path = tmp_path / "usermod.xml"
+    shutil.copy(usermod_path, xml_path)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_path], add_default_files=False, cache_dir=cache_dir
+    )
+    parse_xml_records = um._parse_xml_records
+
+    def changing_parse_xml_records(xml_file_list):
+        records = parse_xml_records(xml_file_list)
+        content = xml_path.read_text().replace('title="PIAA"', 'title="Yadaylation"')
+        xml_path.write_text(content)
+        return records
+
+    um._parse_xml_records = changing_parse_xml_records
+    assert "PIAA" in um.df["Name"].to_list()
+    assert list(cache_dir.glob("*")) == []
+    um.mass_to_combos(100)
+    assert list(cache_dir.glob("*")) == []
+
+
+def test_default_cache_dir_is_per_user(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False
+    )
+    assert um.cache_dir == tmp_path / "unimod_mapper"
+    um.df
+    assert len(list(um.cache_dir.glob("unimod_df_*.npz"))) == 1
+
+
+def test_snapshot_disabled(tmp_path):
+    cache_dir = tmp_path / "cache"
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path],
+        add_default_files=False,
+        use_cache=False,
+        cache_dir=cache_dir,
+    )
+    assert len(um.df) > 0
+    assert cache_dir.exists() is False
+
+
+def test_combo_tables_memory_mapped_from_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    combos = um.mass_to_combos(470.366122, decimals=2)
+    assert len(list(cache_dir.glob("combos_*_n2_*.npy"))) == 2
+
+    um2 = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um2._generate_mass_combos = None  # combo table has to be mapped
+    assert um2.mass_to_combos(470.366122, decimals=2) == combos
+    assert isinstance(um2._mass_combos(2)["mass"], np.memmap)
+    # workers map the table and return their slices of the result
+    masses = [470.366122, 100, 300.2, 470.366122]
+    parallel = um2.masses_to_combos(masses, decimals=2, processes=2, chunk_size=1)
+    for serial_array, parallel_array in zip(
+        um2.masses_to_combos(masses, decimals=2), parallel
+    ):
+        assert np.array_equal(serial_array, parallel_array)
+    assert parallel[0][1] == len(combos)
+
+
+def test_combo_tables_not_cached_for_replaced_df(tmp_path):
+    cache_dir = tmp_path / "cache"
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um._df = pd.DataFrame([{"mono_mass": 0.5, "Name": "a"}])
+    assert um.mass_to_combos(1, decimals=1) == [(1.0, ["a", "a"])]
+    assert list(cache_dir.glob("combos_*")) == []
+
+
+def test_filtered_combo_tables_kept_in_memory(tmp_path):
+    cache_dir = tmp_path / "cache"
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, cache_dir=cache_dir
+    )
+    um.mass_to_combos(470.366122, decimals=2, approved=False)
+    um.mass_to_combos(470.366122, decimals=2, combo_mass_range=(400, 500))
+    assert list(cache_dir.glob("combos_*")) == []
+    assert not isinstance(
+        um._mass_combos(2, combo_mass_range=(400.0, 500.0))["mass"], np.memmap
+    )
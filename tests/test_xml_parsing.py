@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# encoding: utf-8
+from pathlib import Path
+
+import unimod_mapper
+
+test_dir = Path(__file__).parent
+usermod_path = test_dir.joinpath("usermod.xml")
+
+
+def test_xml_parsed_once_for_data_list_and_df():
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, use_cache=False
+    )
+    parsed_files = []
+    iter_xml_records = um._iter_xml_records
+
+    def counting_iter_xml_records(xml_handle):
+        parsed_files.append(xml_handle.name)
+        return iter_xml_records(xml_handle)
+
+    um._iter_xml_records = counting_iter_xml_records
+    assert len(um.data_list) == len(um.records)
+    assert um.df["Name"].nunique() == len(um.records)
+    assert parsed_files == [str(usermod_path)]
+
+
+def test_records_feed_legacy_and_df():
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path], add_default_files=False, use_cache=False
+    )
+    entry = um.data_list[0]
+    assert entry["unimodname"] == "SILAC K+6 TMT"
+    assert entry["specificity"] == [("K", "Isotopic label")]
+    assert um.name_to_composition("SILAC K+6 TMT")[0] == entry["element"]
+
+
+def test_written_mods_reach_df(tmp_path):
+    xml_file = tmp_path / "mymods.xml"
+    unimod_mapper.UnimodMapper(
+        xml_file_list=[xml_file], add_default_files=False, use_cache=False
+    ).writeXML({"mass": 2.0, "name": "MyOldMod", "composition": {"H": 2}}, xml_file)
+    um = unimod_mapper.UnimodMapper(
+        xml_file_list=[usermod_path, xml_file],
+        add_default_files=False,
+        use_cache=False,
+    )
+    assert len(um.data_list) == len(um.records)
+    um.mass_to_combos(100)
+    um.writeXML(
+        {"mass": 1.0, "name": "MyNewMod", "composition": {"H": 1}}, xml_file=xml_file
+    )
+    assert "MyNewMod" in [entry["unimodname"] for entry in um.data_list]
+    assert "MyNewMod" in um.df["Name"].to_list()
+    assert um.combo_cache_info["entries"] == 0
@@ -18,14 +18,15 @@
 """
 import sys
 import os
-import codecs
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as xmldom
 import requests
 
-import bisect
 import numpy as np
-import itertools
 import pandas as pd
 
 from pathlib import Path
@@ -34,6 +35,143 @@ from loguru import logger
 # define the url from where unimod.xml file should be retrieved
 url = "http://www.unimod.org/xml/unimod.xml"
 
+# combo table searched by the worker processes of `masses_to_combos`
+_worker_combos = None
+
+
+def _init_combo_worker(combo_masses, combo_members):
+    """Set the combo table of a worker, memory-mapping the arrays if given paths.
+
+    Args:
+        combo_masses (np.ndarray|str): sorted combo masses or path to them
+        combo_members (np.ndarray|str): member indices of the combos or path
+            to them
+    """
+    global _worker_combos
+    combos = {"mass": combo_masses, "members": combo_members}
+    for key, array in combos.items():
+        if isinstance(array, str):
+            combos[key] = np.load(array, mmap_mode="r", allow_pickle=False)
+    _worker_combos = combos
+
+
+def _combo_windows(combos, lower_masses, upper_masses):
+    """Find the combos in many mass windows.
+
+    Args:
+        combos (dict|None): combo table, see `UnimodMapper._generate_mass_combos`,
+            the table of the worker if None
+        lower_masses (np.ndarray): lower bounds of the windows (inclusive)
+        upper_masses (np.ndarray): upper bounds of the windows (inclusive)
+
+    Returns:
+        tuple: number of combos per window, their combined masses and member
+            indices, windows after each other
+    """
+    if combos is None:
+        combos = _worker_combos
+    combo_masses = combos["mass"]
+    # searching the windows in ascending order keeps the lookups cache friendly
+    order = np.argsort(lower_masses, kind="stable")
+    lower_index = np.empty(len(order), dtype=np.int64)
+    upper_index = np.empty(len(order), dtype=np.int64)
+    lower_index[order] = np.searchsorted(combo_masses, lower_masses[order], "left")
+    upper_index[order] = np.searchsorted(combo_masses, upper_masses[order], "right")
+    # NaN windows sort to the end, so they are empty
+    counts = np.maximum(upper_index - lower_index, 0)
+    starts = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) + np.repeat(lower_index - starts, counts)
+    return counts, combo_masses[positions], combos["members"][positions]
+
+
+class ComboCache(object):
+    """Byte-budgeted LRU cache for combo tables.
+
+    Entries are dicts of numpy arrays; their size is the sum of the array
+    sizes. The least recently used entries are evicted once the budget is
+    exceeded, and all entries are dropped when the table they were derived
+    from changes.
+    """
+
+    def __init__(self, max_bytes=2**30):
+        """Initialize cache.
+
+        Args:
+            max_bytes (int, optional): budget for the arrays of all entries,
+                entries larger than the budget are not cached at all
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version, build):
+        """Get an entry, building and inserting it on a miss.
+
+        Args:
+            key (hashable): entry key
+            version (object): version of the underlying table, compared by
+                identity, the cache is cleared when it changes
+            build (callable): called without arguments to build a missing entry
+
+        Returns:
+            dict: entry
+        """
+        if version is not self._version:
+            self.clear()
+            self._version = version
+        if key in self._entries.keys():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        entry = build()
+        nbytes = sum(array.nbytes for array in entry.values())
+        if nbytes > self.max_bytes:
+            logger.debug(f"Not caching combo table {key} ({nbytes} bytes)")
+            return entry
+        while self.nbytes + nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in evicted.values())
+            self.evictions += 1
+        self._entries[key] = entry
+        self.nbytes += nbytes
+        return entry
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self.nbytes = 0
+
+    def info(self):
+        """Get cache statistics.
+
+        Returns:
+            dict: hits, misses, evictions, entries, nbytes and max_bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# mass difference between 13C and 12C, i.e. between neighbouring isotope peaks
+C13_MASS_DIFFERENCE = 1.003355
+
+# bump whenever layout or content of the parsed table or of the combo tables
+# changes to invalidate old snapshots
+SNAPSHOT_VERSION = 3
+
 
 class UnimodMapper(object):
     """
@@ -58,21 +196,47 @@ class UnimodMapper(object):
 
         return wrapper_deprecation_warning
 
-    def __init__(self, refresh_xml=False, xml_file_list=None, add_default_files=True):
+    def __init__(
+        self,
+        refresh_xml=False,
+        xml_file_list=None,
+        add_default_files=True,
+        use_cache=True,
+        cache_dir=None,
+        combo_cache_bytes=2**30,
+    ):
         """Initialize mapper.
 
         Args:
             refresh_xml (bool, optional): Force fresh download of unimod.xml
             xml_file_list (None, optional): list of user unimod xml files
             add_default_files (bool, optional): Add default unimod files
+            use_cache (bool, optional): Load/store the parsed unimod table from/to
+                a binary snapshot in `cache_dir`
+            cache_dir (None, optional): directory for snapshots, defaults to
+                `unimod_mapper` in the per-user cache directory ($XDG_CACHE_HOME
+                or ~/.cache)
+            combo_cache_bytes (int, optional): memory budget for the combo tables
+                kept by `mass_to_combos`
         """
         if xml_file_list is None:
             xml_file_list = []
+        if cache_dir is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+            cache_dir = Path(cache_home) / "unimod_mapper"
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir)
+        self._records = None
+        self._records_fingerprint = None
         self._data_list = None
         self._mapper = None
         self._df = None
+        self._source_df = None
+        self._source_df_fingerprint = None
+        self._indexes = {}
+        self._indexed_df = None
         self._elements = []
-        self._combos = {}
+        self._combos = ComboCache(max_bytes=combo_cache_bytes)
 
         # Check if unimod.xml file exists & if not reset refresh_xml flag
         full_path = Path(__file__).parent / "unimod.xml"
@@ -91,6 +255,16 @@ class UnimodMapper(object):
                 if xml not in names:
                     self.unimod_xml_names.append(Path(__file__).parent.joinpath(xml))
 
+    @property
+    def records(self):
+        """Get normalized unimod records, parsed once per state of the xml files."""
+        # fingerprint before parsing, so the records never claim newer files
+        fingerprint = self._source_fingerprint()
+        if self._records is None or self._records_fingerprint != fingerprint:
+            self._records = self._parse_xml_records(self.unimod_xml_names)
+            self._records_fingerprint = fingerprint
+        return self._records
+
     @property
     def data_list(self):
         """Get list of unimods."""
@@ -129,22 +303,197 @@ class UnimodMapper(object):
             pd.DataFrame: unimod table
         """
         if self._df is None:
-            self._df = pd.DataFrame(self._parse_in_more_detail_XML())
-            self._df = self._df.explode("specificity").reset_index(drop=True)
-            sites = self._df.specificity.str.split("<\|>", expand=True)
-            sites.columns = [
-                "Site",
-                "Classification",
-                "neutral_loss_elements",
-                "neutral_losses",
-            ]
-            self._df.drop(columns=["specificity"], inplace=True)
-            self._df = self._df.join(sites)
-            self._df.neutral_losses.fillna(0, inplace=True)
-            self._df = self._df.convert_dtypes(convert_floating=False)
-            self._df.neutral_losses = self._df.neutral_losses.astype(float)
+            fingerprint = None
+            if self.use_cache is True:
+                fingerprint = self._source_fingerprint()
+                self._df = self._read_snapshot(self._snapshot_path(fingerprint))
+            if self._df is None:
+                self._df = self._build_df()
+                # only store tables parsed from exactly the fingerprinted files,
+                # i.e. neither from older records nor from files changed meanwhile
+                if fingerprint is not None and (
+                    self._records_fingerprint != fingerprint
+                    or self._source_fingerprint() != fingerprint
+                ):
+                    fingerprint = None
+                if fingerprint is not None:
+                    self._write_snapshot(self._df, self._snapshot_path(fingerprint))
+            # remember the table built from the xml files, derived caches on disk
+            # are only valid as long as it has not been replaced
+            self._source_df = self._df
+            self._source_df_fingerprint = fingerprint
         return self._df
 
+    def _build_df(self):
+        """Build the unimod table from the xml files.
+
+        Returns:
+            pd.DataFrame: unimod table, one row per specificity
+        """
+        df = pd.DataFrame(self._parse_in_more_detail_XML())
+        df = df.explode("specificity").reset_index(drop=True)
+        sites = df.specificity.str.split("<\|>", expand=True)
+        sites.columns = [
+            "Site",
+            "Classification",
+            "neutral_loss_elements",
+            "neutral_losses",
+        ]
+        df.drop(columns=["specificity"], inplace=True)
+        df = df.join(sites)
+        df.insert(
+            df.columns.get_loc("elements") + 1,
+            "hill_notation",
+            df["elements"].map(self._hill_notation),
+        )
+        df.neutral_losses.fillna(0, inplace=True)
+        df = df.convert_dtypes(convert_floating=False)
+        df.neutral_losses = df.neutral_losses.astype(float)
+        return df
+
+    def _source_fingerprint(self):
+        """Fingerprint the xml files the unimod table is built from.
+
+        The fingerprint consists of two hex digests: one of the paths in
+        `unimod_xml_names`, identifying the configuration, and one of size,
+        mtime and content hash of every file, so any change to a source file
+        yields a new key with the same configuration prefix.
+
+        Returns:
+            str: "<configuration>_<contents>" identifying the current state of
+                the xml files
+        """
+        paths = []
+        sources = []
+        for xml_path in self.unimod_xml_names:
+            xml_path = Path(xml_path)
+            paths.append(str(xml_path.resolve()))
+            if xml_path.exists() is False:
+                sources.append(None)
+                continue
+            stat = xml_path.stat()
+            with open(xml_path, "rb") as xml_file:
+                content_hash = hashlib.sha256(xml_file.read()).hexdigest()
+            sources.append([stat.st_size, stat.st_mtime_ns, content_hash])
+        paths_key = hashlib.sha256(json.dumps(paths).encode("utf8")).hexdigest()
+        sources_key = json.dumps([SNAPSHOT_VERSION, sources])
+        sources_key = hashlib.sha256(sources_key.encode("utf8")).hexdigest()
+        return f"{paths_key[:16]}_{sources_key}"
+
+    def _snapshot_path(self, fingerprint=None):
+        """Get the snapshot file for the current xml files.
+
+        Args:
+            fingerprint (str, optional): see `_source_fingerprint`, fingerprints
+                the current xml files by default
+
+        Returns:
+            Path: path of the snapshot
+        """
+        if fingerprint is None:
+            fingerprint = self._source_fingerprint()
+        return self.cache_dir / f"unimod_df_{fingerprint}.npz"
+
+    def _write_snapshot(self, df, snapshot_path):
+        """Store the unimod table as columnar numpy arrays.
+
+        Object columns (e.g. the `elements` dicts) are stored as a single json
+        document, missing values are tracked in a separate mask per column.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            snapshot_path (Path): target file
+        """
+        arrays = {
+            "columns": np.array(df.columns, dtype=str),
+            "dtypes": np.array([str(dtype) for dtype in df.dtypes], dtype=str),
+        }
+        for i, column in enumerate(df.columns):
+            series = df[column]
+            mask = series.isna().to_numpy(dtype=bool)
+            if pd.api.types.is_float_dtype(series.dtype):
+                values = series.to_numpy(dtype=float)
+            elif pd.api.types.is_bool_dtype(series.dtype):
+                values = series.fillna(False).to_numpy(dtype=bool)
+            elif series.dtype == object:
+                values = np.array(
+                    json.dumps([None if is_na else v for v, is_na in zip(series, mask)])
+                )
+            else:
+                values = series.fillna("").astype(str).to_numpy(dtype=str)
+            arrays[f"values_{i}"] = values
+            arrays[f"mask_{i}"] = mask
+
+        # write to a temporary file first, so concurrent readers never see
+        # half written snapshots
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as snapshot_file:
+                np.savez(snapshot_file, **arrays)
+            os.replace(tmp_path, snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write unimod snapshot {snapshot_path}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+        self._prune_cache(snapshot_path)
+        return
+
+    def _prune_cache(self, snapshot_path):
+        """Remove snapshots and combo tables of outdated xml files.
+
+        Cache files carry the fingerprint of the xml files they were built
+        from. Files of the same configuration (set of xml paths) with other
+        contents than the current snapshot are stale and deleted, files of other
+        configurations sharing the cache directory are kept.
+
+        Args:
+            snapshot_path (Path): current snapshot
+        """
+        fingerprint = snapshot_path.stem[len("unimod_df_") :]
+        paths_key = fingerprint.split("_")[0]
+        for pattern in [f"unimod_df_{paths_key}_*.npz", f"combos_{paths_key}_*.npy"]:
+            for path in snapshot_path.parent.glob(pattern):
+                if fingerprint in path.name:
+                    continue
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.debug(f"Could not remove stale cache file {path}: {e}")
+
+    def _read_snapshot(self, snapshot_path):
+        """Load the unimod table from a snapshot.
+
+        Args:
+            snapshot_path (Path): snapshot file
+
+        Returns:
+            pd.DataFrame: unimod table or None if no valid snapshot exists
+        """
+        if snapshot_path.exists() is False:
+            return None
+        try:
+            with np.load(snapshot_path, allow_pickle=False) as snapshot:
+                data = {}
+                for i, (column, dtype) in enumerate(
+                    zip(snapshot["columns"], snapshot["dtypes"])
+                ):
+                    values = snapshot[f"values_{i}"]
+                    mask = snapshot[f"mask_{i}"]
+                    if dtype == "object":
+                        series = pd.Series(json.loads(values.item()), dtype=object)
+                    else:
+                        series = pd.Series(values).astype(dtype)
+                        if mask.any():
+                            series = series.mask(mask)
+                    data[str(column)] = series
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring broken unimod snapshot {snapshot_path}: {e}")
+            return None
+        logger.debug(f"Loaded unimod table from snapshot ({snapshot_path})")
+        return pd.DataFrame(data)
+
     def query(self, query_string):
         """Query the dataframe with a pandas style query
 
@@ -156,6 +505,69 @@ class UnimodMapper(object):
         """
         return self.df.query(query_string)
 
+    def _index(self, name, *args):
+        """Get a lookup index for the current unimod table.
+
+        Indexes are built lazily by `_build_<name>_index` and dropped as soon as
+        the table is replaced (e.g. by `read_mapped_mods_as_df`).
+
+        Args:
+            name (str): name of the index
+            *args: additional arguments passed to the index builder
+
+        Returns:
+            index as returned by the builder
+        """
+        df = self.df
+        if df is not self._indexed_df:
+            self._indexes = {}
+            self._indexed_df = df
+        key = (name,) + args
+        if key not in self._indexes.keys():
+            builder = getattr(self, f"_build_{name}_index")
+            self._indexes[key] = builder(df, *args)
+        return self._indexes[key]
+
+    def _build_column_index(self, df, column):
+        """Column values as numpy array.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            column (str): column name
+
+        Returns:
+            np.ndarray: values of the column
+        """
+        return df[column].to_numpy()
+
+    def _build_group_index(self, df, column):
+        """Map every value of a column to the rows containing it.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            column (str): column name
+
+        Returns:
+            dict: value -> sorted array of row positions
+        """
+        return df.groupby(column, sort=False).indices
+
+    def _lookup(self, key_column, key, column):
+        """Get all values of `column` in rows where `key_column` equals `key`.
+
+        Args:
+            key_column (str): column to match the key against
+            key (str): key to look up
+            column (str): column to return the values from
+
+        Returns:
+            list: values in table order
+        """
+        rows = self._index("group", key_column).get(key, None)
+        if rows is None:
+            return []
+        return self._index("column", column)[rows].tolist()
+
     def name_to_mass(self, name):
         """Get mass for a given name
 
@@ -165,7 +577,7 @@ class UnimodMapper(object):
         Returns:
             list: list of masses
         """
-        return self.df.query("`Name` == @name")["mono_mass"].to_list()
+        return self._lookup("Name", name, "mono_mass")
 
     def name_to_composition(self, name):
         """Get composition for a given name
@@ -176,7 +588,7 @@ class UnimodMapper(object):
         Returns:
             list: list of compositions
         """
-        return self.df.query("`Name` == @name")["elements"].to_list()
+        return self._lookup("Name", name, "elements")
 
     def name_to_neutral_loss(self, name):
         """Get neutral loss for a given name
@@ -187,11 +599,13 @@ class UnimodMapper(object):
         Returns:
             list: list of neutral losses
         """
-        return (
-            self.df.query("`Name` == @name")[["Site", "neutral_losses"]]
-            .to_numpy()
-            .tolist()
-        )
+        return [
+            list(site_and_loss)
+            for site_and_loss in zip(
+                self._lookup("Name", name, "Site"),
+                self._lookup("Name", name, "neutral_losses"),
+            )
+        ]
 
     def name_to_id(self, name):
         """Get unimod ids for a given name
@@ -202,7 +616,7 @@ class UnimodMapper(object):
         Returns:
             list: list of unimod ids
         """
-        return self.df.query("`Name` == @name")["Accession"].to_list()
+        return self._lookup("Name", name, "Accession")
 
     def id_to_mass(self, id):
         """Get mass for a given id
@@ -213,7 +627,7 @@ class UnimodMapper(object):
         Returns:
             list: list of masses
         """
-        return self.df.query("`Accession` == @id")["mono_mass"].to_list()
+        return self._lookup("Accession", id, "mono_mass")
 
     def id_to_composition(self, id):
         """Get composition for a given id
@@ -224,7 +638,7 @@ class UnimodMapper(object):
         Returns:
             list: list of compositions
         """
-        return self.df.query("`Accession` == @id")["elements"].to_list()
+        return self._lookup("Accession", id, "elements")
 
     def id_to_name(self, id):
         """Get name for a given id
@@ -235,82 +649,1417 @@ class UnimodMapper(object):
         Returns:
             list: list of names
         """
-        return self.df.query("`Accession` == @id")["Name"].to_list()
+        return self._lookup("Accession", id, "Name")
+
+    def _determine_mass_range(
+        self, mass, decimals=5, tolerance=None, tolerance_unit="ppm"
+    ):
+        """Determine the mass window searched for a mass.
+
+        Without tolerance, the window covers the masses rounding to `mass` at
+        `decimals` decimal places.
+
+        Args:
+            mass (float|np.ndarray): mass(es)
+            decimals (int, optional): round to n decimal places
+            tolerance (float|tuple, optional): symmetric tolerance or tuple of the
+                tolerances below and above the mass, overrides `decimals`
+            tolerance_unit (str, optional): "ppm" (relative to the mass) or "Da"
+
+        Returns:
+            tuple: lower and upper bound of the window (inclusive)
+        """
+        if tolerance is None:
+            fraction = 1 / 10 ** (decimals + 1)
+            lower_mass = mass - 5 * fraction
+            upper_mass = mass + 4 * fraction
+            return lower_mass, upper_mass
+
+        if isinstance(tolerance, (tuple, list)):
+            lower_tolerance, upper_tolerance = tolerance
+        else:
+            lower_tolerance, upper_tolerance = tolerance, tolerance
+        if tolerance_unit.lower() == "ppm":
+            scale = np.abs(mass) * 1e-6
+        elif tolerance_unit.lower() == "da":
+            scale = 1
+        else:
+            raise ValueError(
+                f"Unknown tolerance unit {tolerance_unit}, use 'ppm' or 'Da'"
+            )
+        return mass - lower_tolerance * scale, mass + upper_tolerance * scale
+
+    def _build_array_index(self, df, column):
+        """Column values as array, keeping pandas extension types.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            column (str): column name
+
+        Returns:
+            np.ndarray|pd.api.extensions.ExtensionArray: values of the column
+        """
+        if pd.api.types.is_extension_array_dtype(df[column].dtype):
+            return df[column].array
+        return df[column].to_numpy()
+
+    def _build_mass_index(
+        self, df, sites=None, classifications=None, neutral_loss=False
+    ):
+        """Sort the mono masses of the table for binary searches.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            sites (tuple, optional): only index rows with one of these sites
+            classifications (tuple, optional): only index rows with one of these
+                classifications
+            neutral_loss (bool, optional): index the masses after the neutral
+                loss (mono_mass - neutral_losses) of the rows with a loss instead
+
+        Returns:
+            tuple: sorted masses (np.ndarray) and their row positions in `df`
+        """
+        masses = pd.to_numeric(df["mono_mass"], errors="coerce").to_numpy(
+            dtype=float, na_value=np.nan
+        )
+        selected = np.ones(len(df), dtype=bool)
+        if neutral_loss is True:
+            losses = pd.to_numeric(df["neutral_losses"], errors="coerce").to_numpy(
+                dtype=float, na_value=np.nan
+            )
+            selected &= np.nan_to_num(losses) != 0
+            masses = masses - losses
+        if sites is not None:
+            self._require_column(df, "Site", "site")
+            selected &= df["Site"].isin(sites).to_numpy(dtype=bool)
+        if classifications is not None:
+            self._require_column(df, "Classification", "classification")
+            selected &= df["Classification"].isin(classifications).to_numpy(dtype=bool)
+        rows = np.flatnonzero(selected)
+        order = rows[np.argsort(masses[rows], kind="stable")]
+        return masses[order], order
+
+    def _specificity_key(self, site=None, classification=None):
+        """Normalize a site and classification filter into index arguments.
+
+        Args:
+            site (str|list, optional): site(s), e.g. "K" or ["N-term", "K"]
+            classification (str|list, optional): classification(s)
+
+        Returns:
+            tuple: sorted sites and classifications (None if not filtered)
+        """
+        if isinstance(site, str):
+            site = [site]
+        if isinstance(classification, str):
+            classification = [classification]
+        return (
+            None if site is None else tuple(sorted(set(site))),
+            None if classification is None else tuple(sorted(set(classification))),
+        )
+
+    def _require_column(self, df, column, argument):
+        """Make sure the table has the column a filter is applied on.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            column (str): filtered column
+            argument (str): name of the filter argument
+        """
+        if column not in df.columns:
+            raise ValueError(
+                f"Cannot filter by {argument}, the table has no {column} column"
+            )
+
+    def _build_codes_index(self, df, column):
+        """Factorize a column into integer codes.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            column (str|tuple): column name or tuple of column names
+
+        Returns:
+            tuple: codes per row (np.ndarray, -1 for missing values) and the
+                number of distinct values
+        """
+        if isinstance(column, tuple):
+            codes, uniques = pd.factorize(pd.MultiIndex.from_frame(df[list(column)]))
+        else:
+            codes, uniques = pd.factorize(df[column])
+        return codes, len(uniques)
+
+    def _mass_window_rows(self, lower_mass, upper_mass, site=None, classification=None):
+        """Get rows with `lower_mass` <= mono_mass <= `upper_mass`.
+
+        Args:
+            lower_mass (float): lower bound (inclusive)
+            upper_mass (float): upper bound (inclusive)
+            site (str|list, optional): only rows with this site (one of these)
+            classification (str|list, optional): only rows with this
+                classification (one of these)
+
+        Returns:
+            np.ndarray: row positions in table order
+        """
+        offsets, rows = self._mass_windows_rows(
+            np.atleast_1d(lower_mass),
+            np.atleast_1d(upper_mass),
+            site=site,
+            classification=classification,
+        )
+        return rows
+
+    def _mass_windows_rows(
+        self,
+        lower_masses,
+        upper_masses,
+        site=None,
+        classification=None,
+        neutral_loss=False,
+    ):
+        """Get rows within many mass windows at once.
+
+        Rows are searched in a sorted mass index per site and classification
+        filter, so filtering costs nothing per query.
+
+        Args:
+            lower_masses (np.ndarray): lower bounds (inclusive)
+            upper_masses (np.ndarray): upper bounds (inclusive)
+            site (str|list, optional): see `_mass_window_rows`
+            classification (str|list, optional): see `_mass_window_rows`
+            neutral_loss (bool, optional): search the masses after the neutral
+                loss of rows with a loss instead of the mono masses
+
+        Returns:
+            tuple: CSR layout, i.e. offsets (np.ndarray of length n + 1) and row
+                positions (np.ndarray), rows of window i are
+                rows[offsets[i]:offsets[i + 1]] in table order
+        """
+        masses, order = self._index(
+            "mass",
+            *self._specificity_key(site=site, classification=classification),
+            neutral_loss,
+        )
+        lower_index = np.searchsorted(masses, lower_masses, side="left")
+        upper_index = np.searchsorted(masses, upper_masses, side="right")
+        counts = upper_index - lower_index
+        counts[np.isnan(lower_masses) | np.isnan(upper_masses) | (counts < 0)] = 0
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        positions = np.repeat(lower_index - offsets[:-1], counts) + np.arange(
+            offsets[-1]
+        )
+        rows = order[positions]
+        windows = np.repeat(np.arange(len(counts)), counts)
+        return offsets, rows[np.lexsort((rows, windows))]
+
+    def _unique_per_window(self, offsets, rows, column):
+        """Drop rows repeating a value of `column` within the same window.
+
+        Args:
+            offsets (np.ndarray): CSR offsets
+            rows (np.ndarray): CSR row positions
+            column (str): column name
+
+        Returns:
+            tuple: CSR offsets and row positions, first occurrences only
+        """
+        codes, n_codes = self._index("codes", column)
+        windows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        _, first = np.unique(
+            windows * (n_codes + 1) + codes[rows] + 1, return_index=True
+        )
+        first.sort()
+        unique_offsets = np.zeros_like(offsets)
+        np.cumsum(
+            np.bincount(windows[first], minlength=len(offsets) - 1),
+            out=unique_offsets[1:],
+        )
+        return unique_offsets, rows[first]
+
+    def _masses_to_values(
+        self,
+        masses,
+        decimals,
+        column,
+        unique,
+        as_frame,
+        isotope_errors=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+    ):
+        """Look up the values of `column` for many masses.
+
+        Args:
+            masses (np.ndarray|pd.Series|list): masses
+            decimals (int): see `_determine_mass_range`
+            column (str): column to return
+            unique (bool): report every value only once per mass (and isotope
+                error)
+            as_frame (bool): return a long-form DataFrame instead of CSR arrays
+            isotope_errors (list, optional): see `masses_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+
+        Returns:
+            tuple|pd.DataFrame: see `masses_to_ids`
+        """
+        masses = np.asarray(masses, dtype=float)
+        windows, window_errors = self._isotope_shifted_masses(masses, isotope_errors)
+        lower_masses, upper_masses = self._determine_mass_range(
+            windows, decimals, tolerance=tolerance, tolerance_unit=tolerance_unit
+        )
+        offsets, rows = self._mass_windows_rows(lower_masses, upper_masses)
+        if unique is True:
+            offsets, rows = self._unique_per_window(offsets, rows, column)
+        errors = np.repeat(window_errors, np.diff(offsets))
+        # windows of a mass are adjacent, so every n-th offset delimits masses
+        offsets = offsets[:: max(len(windows), 1) // max(len(masses), 1)]
+        if as_frame is True:
+            frame = pd.DataFrame(
+                {
+                    "input_index": np.repeat(np.arange(len(masses)), np.diff(offsets)),
+                    column: self._index("array", column)[rows],
+                }
+            )
+            if isotope_errors is not None:
+                frame["isotope_error"] = errors
+            return frame
+        if isotope_errors is not None:
+            return offsets, self._index("column", column)[rows], errors
+        return offsets, self._index("column", column)[rows]
+
+    def _isotope_shifted_masses(self, masses, isotope_errors=None):
+        """Shift masses by isotope errors.
+
+        Args:
+            masses (np.ndarray): masses
+            isotope_errors (list, optional): numbers of 13C isotope peaks a mass
+                may be off by, e.g. range(-1, 3)
+
+        Returns:
+            tuple: shifted masses (len(isotope_errors) per mass, adjacent) and
+                the isotope error of every shifted mass
+        """
+        if isotope_errors is None:
+            return masses, np.zeros(len(masses), dtype=np.int64)
+        isotope_errors = np.asarray(list(isotope_errors), dtype=np.int64)
+        if len(isotope_errors) == 0:
+            raise ValueError("At least one isotope error is required, e.g. [0]")
+        shifted = masses[:, None] - isotope_errors[None, :] * C13_MASS_DIFFERENCE
+        return shifted.ravel(), np.tile(isotope_errors, len(masses))
+
+    def masses_to_ids(
+        self,
+        masses,
+        decimals=5,
+        as_frame=False,
+        isotope_errors=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+    ):
+        """Get ids for many masses in one vectorized call
+
+        Args:
+            masses (np.ndarray|pd.Series|list): masses of the unimods
+            decimals (int, optional): see `mass_to_ids`
+            as_frame (bool, optional): return a long-form DataFrame
+            isotope_errors (list, optional): also search the masses shifted by
+                these numbers of 13C isotope peaks, i.e. mass - k * 1.003355 for
+                every isotope error k, in the same vectorized pass
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+
+        Returns:
+            tuple|pd.DataFrame: CSR layout, i.e. offsets (np.ndarray of length
+                len(masses) + 1) and ids (np.ndarray), the ids of masses[i] are
+                ids[offsets[i]:offsets[i + 1]]. With `as_frame`, a DataFrame with
+                columns input_index (position in `masses`) and Accession. With
+                `isotope_errors`, the isotope error of every match is returned as
+                third array or as column isotope_error.
+        """
+        return self._masses_to_values(
+            masses,
+            decimals,
+            "Accession",
+            unique=True,
+            as_frame=as_frame,
+            isotope_errors=isotope_errors,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+
+    def masses_to_names(
+        self,
+        masses,
+        decimals=5,
+        as_frame=False,
+        isotope_errors=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+    ):
+        """Get names for many masses in one vectorized call
+
+        Args:
+            masses (np.ndarray|pd.Series|list): masses of the unimods
+            decimals (int, optional): see `mass_to_names`
+            as_frame (bool, optional): return a long-form DataFrame
+            isotope_errors (list, optional): see `masses_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+
+        Returns:
+            tuple|pd.DataFrame: CSR offsets and names or DataFrame with columns
+                input_index and Name, see `masses_to_ids`
+        """
+        return self._masses_to_values(
+            masses,
+            decimals,
+            "Name",
+            unique=True,
+            as_frame=as_frame,
+            isotope_errors=isotope_errors,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+
+    def masses_to_compositions(
+        self,
+        masses,
+        decimals=5,
+        as_frame=False,
+        isotope_errors=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+    ):
+        """Get compositions for many masses in one vectorized call
 
-    def _determine_mass_range(self, mass, decimals=5):
-        fraction = 1 / 10 ** (decimals + 1)
-        lower_mass = mass - 5 * fraction
-        upper_mass = mass + 4 * fraction
-        return lower_mass, upper_mass
+        Args:
+            masses (np.ndarray|pd.Series|list): masses of the unimods
+            decimals (int, optional): see `mass_to_compositions`
+            as_frame (bool, optional): return a long-form DataFrame
+            isotope_errors (list, optional): see `masses_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+
+        Returns:
+            tuple|pd.DataFrame: CSR offsets and compositions or DataFrame with
+                columns input_index and elements, see `masses_to_ids`
+        """
+        return self._masses_to_values(
+            masses,
+            decimals,
+            "elements",
+            unique=False,
+            as_frame=as_frame,
+            isotope_errors=isotope_errors,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
 
-    def mass_to_ids(self, mass, decimals=5):
+    def mass_to_ids(
+        self,
+        mass,
+        decimals=5,
+        tolerance=None,
+        tolerance_unit="ppm",
+        site=None,
+        classification=None,
+    ):
         """Get ids for a given mass
 
         Args:
             name (str): mass of the unimod
+            decimals (int, optional): round to n decimal places
+            tolerance (float|tuple, optional): symmetric tolerance, or tuple of
+                the tolerances below and above the mass, instead of `decimals`
+            tolerance_unit (str, optional): unit of the tolerance, "ppm" or "Da"
+            site (str|list, optional): only consider specificities for this site
+                (or one of these sites), e.g. "K" or "N-term"
+            classification (str|list, optional): only consider specificities of
+                this classification (or one of these)
 
         Returns:
             list: list of ids
         """
-        lower_mass, upper_mass = self._determine_mass_range(mass, decimals=decimals)
-        return self.df.query("@lower_mass <= `mono_mass` <= @upper_mass")[
-            "Accession"
-        ].unique()
-
-    def mass_to_compositions(self, mass, decimals=5):
+        lower_mass, upper_mass = self._determine_mass_range(
+            mass,
+            decimals=decimals,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+        rows = self._mass_window_rows(
+            lower_mass, upper_mass, site=site, classification=classification
+        )
+        return pd.unique(self._index("array", "Accession")[rows])
+
+    def mass_to_compositions(
+        self,
+        mass,
+        decimals=5,
+        tolerance=None,
+        tolerance_unit="ppm",
+        site=None,
+        classification=None,
+    ):
         """Get compositions for a given mass
 
         Args:
             name (float|int): mass of the unimod
+            decimals (int, optional): see `mass_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+            site (str|list, optional): see `mass_to_ids`
+            classification (str|list, optional): see `mass_to_ids`
 
         Returns:
             list: list of compositons
         """
-        lower_mass, upper_mass = self._determine_mass_range(mass, decimals=decimals)
-        return self.df.query("@lower_mass <= `mono_mass` <= @upper_mass")[
-            "elements"
-        ].tolist()
-
-    def mass_to_names(self, mass, decimals=5):
+        lower_mass, upper_mass = self._determine_mass_range(
+            mass,
+            decimals=decimals,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+        rows = self._mass_window_rows(
+            lower_mass, upper_mass, site=site, classification=classification
+        )
+        return self._index("column", "elements")[rows].tolist()
+
+    def mass_to_names(
+        self,
+        mass,
+        decimals=5,
+        tolerance=None,
+        tolerance_unit="ppm",
+        site=None,
+        classification=None,
+    ):
         """Get names for a given mass
 
         Args:
             name (float|int): mass of the unimod
+            decimals (int, optional): see `mass_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+            site (str|list, optional): see `mass_to_ids`
+            classification (str|list, optional): see `mass_to_ids`
 
         Returns:
             list: list of names
         """
-        lower_mass, upper_mass = self._determine_mass_range(mass, decimals=decimals)
-        return self.df.query("@lower_mass <= `mono_mass` <= @upper_mass")[
-            "Name"
-        ].unique()
+        lower_mass, upper_mass = self._determine_mass_range(
+            mass,
+            decimals=decimals,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+        rows = self._mass_window_rows(
+            lower_mass, upper_mass, site=site, classification=classification
+        )
+        return pd.unique(self._index("array", "Name")[rows])
+
+    def annotate_dataframe(
+        self,
+        df,
+        mass_col="delta_mass",
+        tolerance=0.01,
+        tolerance_unit="Da",
+        neutral_losses=False,
+    ):
+        """Match the masses of a DataFrame (e.g. PSM delta masses) against unimod
+
+        This is an interval join: the windows of all masses are searched in the
+        sorted mono masses in one vectorized pass.
+
+        Args:
+            df (pd.DataFrame): DataFrame to annotate
+            mass_col (str, optional): column holding the masses
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): "Da" or "ppm", see `mass_to_ids`
+            neutral_losses (bool, optional): also match the masses after the
+                neutral losses, see `mass_to_matches`
+
+        Returns:
+            pd.DataFrame: long-form matches with columns psm_index (index label
+                of the row in `df`), Accession, Name, mono_mass and error (mass -
+                mono_mass), every Accession once per row. With `neutral_losses`,
+                also the columns neutral_loss and form, see `mass_to_matches`.
+        """
+        masses = pd.to_numeric(df[mass_col], errors="coerce").to_numpy(
+            dtype=float, na_value=np.nan
+        )
+        lower_masses, upper_masses = self._determine_mass_range(
+            masses, tolerance=tolerance, tolerance_unit=tolerance_unit
+        )
+        matches = self._matches_frame(
+            masses, lower_masses, upper_masses, neutral_losses=neutral_losses
+        )
+        matches.insert(0, "psm_index", df.index[matches.pop("input_index")])
+        return matches
+
+    def mass_to_matches(
+        self,
+        mass,
+        decimals=5,
+        tolerance=None,
+        tolerance_unit="ppm",
+        neutral_losses=True,
+    ):
+        """Match a mass against the mono masses and the masses after neutral loss
+
+        Masses after neutral loss (mono_mass - neutral_losses of specificities
+        with a loss) are searched in a sorted index of their own.
+
+        Args:
+            mass (float|int): mass
+            decimals (int, optional): see `mass_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+            neutral_losses (bool, optional): also match the masses after the
+                neutral losses, tables without a neutral_losses column only
+                match intact
+
+        Returns:
+            pd.DataFrame: columns Accession, Name, mono_mass, neutral_loss, form
+                ("intact" if the mono mass matched or "neutral_loss" if the mass
+                after the neutral loss matched) and error (mass - matched mass)
+        """
+        masses = np.atleast_1d(np.asarray(mass, dtype=float))
+        lower_masses, upper_masses = self._determine_mass_range(
+            masses,
+            decimals=decimals,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+        matches = self._matches_frame(
+            masses, lower_masses, upper_masses, neutral_losses=neutral_losses
+        )
+        if neutral_losses is False:
+            matches.insert(4, "neutral_loss", 0.0)
+            matches.insert(5, "form", "intact")
+        return matches.drop(columns="input_index")
+
+    def _matches_frame(self, masses, lower_masses, upper_masses, neutral_losses):
+        """Collect the unimod entries matching many mass windows.
+
+        Args:
+            masses (np.ndarray): masses
+            lower_masses (np.ndarray): lower bounds (inclusive)
+            upper_masses (np.ndarray): upper bounds (inclusive)
+            neutral_losses (bool): also match the masses after the neutral losses
+
+        Returns:
+            pd.DataFrame: columns input_index, Accession, Name, mono_mass,
+                (neutral_loss, form,) error; matches of a mass after each other,
+                intact ones first, every Accession (and neutral loss) once
+        """
+        offsets, rows = self._mass_windows_rows(lower_masses, upper_masses)
+        offsets, rows = self._unique_per_window(offsets, rows, "Accession")
+        windows = np.repeat(np.arange(len(masses)), np.diff(offsets))
+        is_loss = np.zeros(len(rows), dtype=bool)
+        # tables without losses, e.g. from `read_mapped_mods_as_df`, only match intact
+        has_losses = neutral_losses is True and "neutral_losses" in self.df.columns
+        if has_losses is True:
+            loss_offsets, loss_rows = self._mass_windows_rows(
+                lower_masses, upper_masses, neutral_loss=True
+            )
+            loss_offsets, loss_rows = self._unique_per_window(
+                loss_offsets, loss_rows, ("Accession", "neutral_losses")
+            )
+            windows = np.concatenate(
+                [windows, np.repeat(np.arange(len(masses)), np.diff(loss_offsets))]
+            )
+            rows = np.concatenate([rows, loss_rows])
+            is_loss = np.concatenate([is_loss, np.ones(len(loss_rows), dtype=bool)])
+            order = np.argsort(windows, kind="stable")
+            windows, rows, is_loss = windows[order], rows[order], is_loss[order]
+
+        mono_masses = self._index("column", "mono_mass")[rows].astype(float)
+        matches = pd.DataFrame(
+            {
+                "input_index": windows,
+                "Accession": self._index("array", "Accession")[rows],
+                "Name": self._index("array", "Name")[rows],
+                "mono_mass": mono_masses,
+            }
+        )
+        matched_masses = mono_masses
+        if neutral_losses is True:
+            losses = np.zeros(len(rows))
+            if has_losses is True:
+                losses = self._index("column", "neutral_losses")[rows].astype(float)
+                losses = np.where(is_loss, losses, 0.0)
+            matched_masses = mono_masses - losses
+            matches["neutral_loss"] = losses
+            matches["form"] = np.where(is_loss, "neutral_loss", "intact")
+        matches["error"] = masses[windows] - matched_masses
+        return matches
+
+    def nearest_mods(self, mass, k=5, max_error=None):
+        """Get the k mods with the mono mass closest to a mass
+
+        Args:
+            mass (float|int): mass
+            k (int, optional): number of mods
+            max_error (float, optional): only mods within this absolute mass
+                error (Da)
+
+        Returns:
+            pd.DataFrame: columns Accession, Name, mono_mass and error (mass -
+                mono_mass), closest mod first
+        """
+        nearest = self.masses_to_nearest_mods([mass], k=k, max_error=max_error)
+        return nearest.drop(columns="input_index")
+
+    def masses_to_nearest_mods(self, masses, k=5, max_error=None):
+        """Get the k mods with the mono mass closest to each of many masses
+
+        Every mass is located with one binary search in the distinct mod
+        masses, the k closest mods are among the k neighbours on either side.
+
+        Args:
+            masses (np.ndarray|pd.Series|list): masses
+            k (int, optional): number of mods per mass
+            max_error (float, optional): see `nearest_mods`
+
+        Returns:
+            pd.DataFrame: columns input_index (position in `masses`), Accession,
+                Name, mono_mass and error (mass - mono_mass), closest mod first
+        """
+        masses = np.asarray(masses, dtype=float)
+        mods = self._index("nearest_mods")
+        mod_masses = mods["mono_mass"].to_numpy()
+        position = np.searchsorted(mod_masses, masses)
+        candidates = position[:, None] + np.arange(-k, k)[None, :]
+        valid = (candidates >= 0) & (candidates < len(mod_masses))
+        candidates = np.clip(candidates, 0, max(len(mod_masses) - 1, 0))
+        if len(mod_masses) == 0:
+            mod_masses = np.full(1, np.nan)
+        errors = masses[:, None] - mod_masses[candidates]
+        distances = np.where(valid, np.abs(errors), np.inf)
+        # candidates are in mass order, so ties prefer the lighter mod
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        nearest = np.take_along_axis(candidates, order, axis=1)
+        keep = np.take_along_axis(distances, order, axis=1)
+        if max_error is None:
+            keep = np.isfinite(keep)
+        else:
+            keep = keep <= max_error
+        input_index = np.nonzero(keep)[0]
+        rows = nearest[keep]
+        nearest_mods = mods.iloc[rows].reset_index(drop=True)
+        nearest_mods.insert(0, "input_index", input_index)
+        nearest_mods["error"] = masses[input_index] - mod_masses[rows]
+        return nearest_mods
+
+    def _build_nearest_mods_index(self, df):
+        """Distinct (Accession, Name, mono_mass) entries sorted by mass.
+
+        Args:
+            df (pd.DataFrame): unimod table
+
+        Returns:
+            pd.DataFrame: columns Accession, Name and mono_mass (float, no NaN)
+        """
+        mods = df[["Accession", "Name", "mono_mass"]].drop_duplicates()
+        mods = mods.assign(
+            mono_mass=pd.to_numeric(mods["mono_mass"], errors="coerce").astype(float)
+        )
+        mods = mods[mods["mono_mass"].notna()]
+        return mods.sort_values("mono_mass", kind="stable").reset_index(drop=True)
 
-    def mass_to_combos(self, mass, n=2, decimals=5):
+    @property
+    def combo_mods(self):
+        """Get the distinct mods combos are formed of.
+
+        Member indices returned by `mass_to_combos(..., return_indices=True)`
+        refer to the rows of this table.
+
+        Returns:
+            pd.DataFrame: table with columns mono_mass and Name
+        """
+        mods = self._index("combo_mods")
+        return pd.DataFrame({"mono_mass": mods["mass"], "Name": mods["mod_names"]})
+
+    def mass_to_combos(
+        self,
+        mass,
+        n=2,
+        decimals=5,
+        on_demand=False,
+        return_indices=False,
+        with_composition=False,
+        classification=None,
+        approved=None,
+        site=None,
+        mod_mass_range=None,
+        combo_mass_range=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+    ):
         """Generate all combos of length n rounded to `decimals` decimal places
 
+        Combos can be restricted to mods with at least one specificity matching
+        all of the given filters; combo tables are built and cached per filter.
+
         Args:
             mass (float|int): combined mass
             n (int, optional): number of allowed mods to form the combined mass
             decimals (int, optional): round to n decimal places
+            on_demand (bool, optional): search the combos of length n directly
+                on the distinct mod masses instead of precomputing all combos of
+                length n, cannot be combined with `combo_mass_range`. Without a
+                `combo_mass_range`, combos of length n >= 3 are never
+                precomputed but enumerated within the mass window either way.
+            return_indices (bool, optional): return the combined masses and the
+                member indices into `combo_mods` as arrays instead of tuples
+            with_composition (bool, optional): add the summed elemental
+                composition of the members to every combo
+            classification (str|list, optional): only combine mods with this
+                classification (or one of these), e.g. "Post-translational"
+            approved (bool, optional): only combine mods with this PSI-MS
+                approved flag
+            site (str|list, optional): only combine mods specific for this site
+                (or one of these sites), e.g. "K" or ["K", "N-term"]
+            mod_mass_range (tuple, optional): only combine mods with a mass
+                within these bounds (inclusive)
+            combo_mass_range (tuple, optional): only build the combo table for
+                combined masses within these bounds (inclusive), which keeps
+                the table small if only a range of masses is queried. The
+                window of `mass` has to lie within the bounds.
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
 
         Returns:
             list: list of tuples containing the combined and single masses
+                (a generator of such tuples, not sorted by mass, with on_demand).
+                With return_indices, a tuple of combined masses (np.ndarray)
+                and member indices (np.ndarray of shape (len(masses), n)), or a
+                generator of such tuples with on_demand. With with_composition,
+                the tuples get the composition (dict) as third item, or the
+                element counts (pd.DataFrame, one column per element) with
+                return_indices.
+        """
+        lower_mass, upper_mass = self._determine_mass_range(
+            mass,
+            decimals=decimals,
+            tolerance=tolerance,
+            tolerance_unit=tolerance_unit,
+        )
+        filter_key = self._combo_filter_key(
+            classifications=classification,
+            approved=approved,
+            sites=site,
+            mod_mass_range=mod_mass_range,
+        )
+        if on_demand is True:
+            if combo_mass_range is not None:
+                raise ValueError(
+                    "combo_mass_range limits precomputed combo tables and cannot "
+                    "be used with on_demand"
+                )
+            chunks = self._iter_mass_combos(
+                lower_mass,
+                upper_mass,
+                n,
+                universe=self._combo_universe(filter_key),
+                min_n=n,
+            )
+            if return_indices is True:
+                if with_composition is True:
+                    return (
+                        (masses, members, self._combo_compositions(members))
+                        for masses, members in chunks
+                    )
+                return chunks
+            return (
+                combo
+                for chunk in chunks
+                for combo in self._combos_to_tuples(
+                    *chunk, with_composition=with_composition
+                )
+            )
+
+        if combo_mass_range is not None:
+            combo_mass_range = tuple(map(float, combo_mass_range))
+            if lower_mass < combo_mass_range[0] or upper_mass > combo_mass_range[1]:
+                raise ValueError(
+                    f"Mass window [{lower_mass}, {upper_mass}] is not within the "
+                    f"combo mass range {list(combo_mass_range)}"
+                )
+            combos = self._mass_combos(n, filter_key, combo_mass_range)
+        elif n >= 3:
+            # the full table of longer combos does not fit into memory, only the
+            # combos within the mass window are enumerated and not cached
+            combos = self._generate_mass_combos(n, filter_key, (lower_mass, upper_mass))
+        else:
+            combos = self._mass_combos(n, filter_key)
+        lower_index = np.searchsorted(combos["mass"], lower_mass, side="left")
+        upper_index = np.searchsorted(combos["mass"], upper_mass, side="right")
+        masses = combos["mass"][lower_index:upper_index]
+        members = combos["members"][lower_index:upper_index]
+        if return_indices is True:
+            if with_composition is True:
+                return masses, members, self._combo_compositions(members)
+            return masses, members
+        return self._combos_to_tuples(masses, members, with_composition=with_composition)
+
+    def masses_to_combos(
+        self,
+        masses,
+        n=2,
+        decimals=5,
+        as_frame=False,
+        processes=1,
+        chunk_size=100000,
+        isotope_errors=None,
+        tolerance=None,
+        tolerance_unit="ppm",
+        combo_mass_range=None,
+    ):
+        """Get the combos of length n for many masses in one vectorized call
+
+        Args:
+            masses (np.ndarray|pd.Series|list): combined masses
+            n (int, optional): number of mods to form the combined masses
+            decimals (int, optional): see `mass_to_combos`
+            as_frame (bool, optional): return a long-form DataFrame
+            processes (int, optional): number of worker processes the chunks of
+                masses are searched in. Every worker gathers the combined masses
+                and members of its chunks; the combo table is memory-mapped by
+                every worker when it is cached on disk.
+            chunk_size (int, optional): number of masses per chunk
+            isotope_errors (list, optional): see `masses_to_ids`
+            tolerance (float|tuple, optional): see `mass_to_ids`
+            tolerance_unit (str, optional): see `mass_to_ids`
+            combo_mass_range (tuple, optional): see `mass_to_combos`, the windows
+                of all masses have to lie within the bounds. Required for
+                n >= 3, since the full combo table does not fit into memory.
+
+        Returns:
+            tuple|pd.DataFrame: CSR layout, i.e. offsets (np.ndarray of length
+                len(masses) + 1), combined masses (np.ndarray) and member indices
+                into `combo_mods` (np.ndarray of shape (len(combo masses), n)),
+                the combos of masses[i] are at offsets[i]:offsets[i + 1]. With
+                `as_frame`, a DataFrame with columns input_index (position in
+                `masses`), mono_mass (combined mass) and Names (list of names).
+                With `isotope_errors`, the isotope error of every combo is
+                returned as fourth array or as column isotope_error.
+        """
+        masses = np.asarray(masses, dtype=float)
+        windows, window_errors = self._isotope_shifted_masses(masses, isotope_errors)
+        lower_masses, upper_masses = self._determine_mass_range(
+            windows, decimals, tolerance=tolerance, tolerance_unit=tolerance_unit
+        )
+        if combo_mass_range is not None:
+            combo_mass_range = tuple(map(float, combo_mass_range))
+            outside = (lower_masses < combo_mass_range[0]) | (
+                upper_masses > combo_mass_range[1]
+            )
+            if outside.any():
+                raise ValueError(
+                    f"{outside.sum()} mass windows are not within the combo mass "
+                    f"range {list(combo_mass_range)}"
+                )
+        elif n >= 3:
+            raise ValueError(
+                f"The table of all combos of length {n} does not fit into memory, "
+                "pass a combo_mass_range or use mass_to_combos with on_demand=True"
+            )
+        combos = self._mass_combos(n, combo_mass_range=combo_mass_range)
+        bounds = [
+            (
+                lower_masses[start : start + chunk_size],
+                upper_masses[start : start + chunk_size],
+            )
+            for start in range(0, len(windows), chunk_size)
+        ]
+        if processes > 1 and len(bounds) > 1:
+            # workers memory-map the table when it is cached on disk and return
+            # their finished slices of the result
+            tables = [
+                str(array.filename) if isinstance(array, np.memmap) else array
+                for array in (combos["mass"], combos["members"])
+            ]
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_combo_worker,
+                initargs=tuple(tables),
+            ) as executor:
+                results = list(
+                    executor.map(
+                        _combo_windows,
+                        [None] * len(bounds),
+                        *zip(*bounds),
+                    )
+                )
+        else:
+            results = [_combo_windows(combos, lower, upper) for lower, upper in bounds]
+
+        offsets = np.zeros(len(windows) + 1, dtype=np.int64)
+        combo_masses = np.zeros(0)
+        members = np.zeros((0, n), dtype=np.int32)
+        if len(results) > 0:
+            counts, combo_masses, members = [
+                np.concatenate(arrays) for arrays in zip(*results)
+            ]
+            np.cumsum(counts, out=offsets[1:])
+        errors = np.repeat(window_errors, np.diff(offsets))
+        offsets = offsets[:: max(len(windows), 1) // max(len(masses), 1)]
+        if as_frame is True:
+            mod_names = self._index("combo_mods")["mod_names"]
+            frame = pd.DataFrame(
+                {
+                    "input_index": np.repeat(np.arange(len(masses)), np.diff(offsets)),
+                    "mono_mass": combo_masses,
+                    "Names": mod_names[members].tolist(),
+                }
+            )
+            if isotope_errors is not None:
+                frame["isotope_error"] = errors
+            return frame
+        if isotope_errors is not None:
+            return offsets, combo_masses, members, errors
+        return offsets, combo_masses, members
+
+    def _mass_combos(self, n, filter_key=None, combo_mass_range=None):
+        """Get the combo table of length n from the combo cache, loading it on a miss.
+
+        Args:
+            n (int): number of combinated mods
+            filter_key (tuple, optional): see `_combo_filter_key`
+            combo_mass_range (tuple, optional): see `_generate_mass_combos`
+
+        Returns:
+            dict: combo table, see `_generate_mass_combos`
+        """
+        return self._combos.get(
+            (n, filter_key, combo_mass_range),
+            self.df,
+            lambda: self._load_mass_combos(
+                n=n, filter_key=filter_key, combo_mass_range=combo_mass_range
+            ),
+        )
+
+    @property
+    def combo_cache_info(self):
+        """Get hit, miss and eviction counts and the size of the combo cache."""
+        return self._combos.info()
+
+    def _combo_filter_key(
+        self, classifications=None, approved=None, sites=None, mod_mass_range=None
+    ):
+        """Normalize the filters of the mods combos are formed of.
+
+        Args:
+            classifications (str|list, optional): see `classification` of
+                `mass_to_combos`
+            approved (bool, optional): see `mass_to_combos`
+            sites (str|list, optional): see `site` of `mass_to_combos`
+            mod_mass_range (tuple, optional): see `mass_to_combos`
+
+        Returns:
+            tuple|None: hashable filter key, None without filters
+        """
+        if isinstance(classifications, str):
+            classifications = [classifications]
+        if isinstance(sites, str):
+            sites = [sites]
+        filter_key = (
+            None if classifications is None else tuple(sorted(set(classifications))),
+            None if approved is None else bool(approved),
+            None if sites is None else tuple(sorted(set(sites))),
+            None if mod_mass_range is None else tuple(map(float, mod_mass_range)),
+        )
+        if filter_key == (None, None, None, None):
+            return None
+        return filter_key
+
+    def _combo_universe(self, filter_key):
+        """Get the distinct mods passing a filter.
+
+        Args:
+            filter_key (tuple|None): see `_combo_filter_key`
+
+        Returns:
+            np.ndarray|None: ascending indices into the distinct mods, None
+                without filters
         """
-        if n not in self._combos.keys():
-            self._combos[n] = self._generate_mass_combos(n=n)
+        if filter_key is None:
+            return None
+        return self._index("combo_universe", filter_key)
+
+    def _build_combo_universe_index(self, df, filter_key):
+        """Distinct mods with at least one row passing a filter.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            filter_key (tuple): see `_combo_filter_key`
+
+        Returns:
+            np.ndarray: ascending indices into the distinct mods
+        """
+        classifications, approved, sites, mod_mass_range = filter_key
+        rows = np.ones(len(df), dtype=bool)
+        if classifications is not None:
+            self._require_column(df, "Classification", "classification")
+            rows &= df["Classification"].isin(classifications).to_numpy(dtype=bool)
+        if approved is not None:
+            self._require_column(df, "PSI-MS approved", "approved")
+            rows &= df["PSI-MS approved"].to_numpy(dtype=bool) == approved
+        if sites is not None:
+            self._require_column(df, "Site", "site")
+            rows &= df["Site"].isin(sites).to_numpy(dtype=bool)
+        if mod_mass_range is not None:
+            masses = df["mono_mass"].to_numpy(dtype=float)
+            rows &= (mod_mass_range[0] <= masses) & (masses <= mod_mass_range[1])
+        return np.unique(self._index("combo_mods")["row_mods"][rows])
+
+    def _combos_to_tuples(self, masses, members, with_composition=False):
+        """Materialize combos as tuples of combined mass and mod names.
+
+        Args:
+            masses (np.ndarray): combined masses
+            members (np.ndarray): member indices into the distinct mods
+            with_composition (bool, optional): add the summed compositions
 
+        Returns:
+            list: list of tuples containing the combined mass and the names
+                (and the composition)
+        """
+        mod_names = self._index("combo_mods")["mod_names"]
+        if with_composition is False:
+            return list(zip(masses, mod_names[members].tolist()))
+        elements = self._index("combo_elements")["elements"]
+        compositions = [
+            {element: count for element, count in zip(elements, row) if count != 0}
+            for row in self._combo_compositions(members).to_numpy().tolist()
+        ]
+        return list(zip(masses, mod_names[members].tolist(), compositions))
+
+    def _combo_compositions(self, members):
+        """Sum the element counts of the members of many combos.
+
+        Args:
+            members (np.ndarray): member indices into the distinct mods
+
+        Returns:
+            pd.DataFrame: element counts, one row per combo and one column per
+                element
+        """
+        combo_elements = self._index("combo_elements")
+        counts = combo_elements["counts"][members].sum(axis=1, dtype=np.int64)
+        return pd.DataFrame(counts, columns=combo_elements["elements"])
+
+    def mass_to_difference_combos(self, mass, decimals=5, return_indices=False):
+        """Find pairs of mods whose mass difference matches a mass
+
+        Differences are searched as one binary search per subtrahend on the
+        sorted distinct mod masses, without building the table of all
+        differences. A mod is never paired with itself.
+
+        Args:
+            mass (float|int): mass difference, i.e. mass of the first minus the
+                mass of the second mod
+            decimals (int, optional): round to n decimal places
+            return_indices (bool, optional): return the mass differences and the
+                member indices into `combo_mods` as arrays instead of tuples
+
+        Returns:
+            list: list of tuples containing the mass difference and the names of
+                the added and the subtracted mod, sorted by mass difference. With
+                return_indices, a tuple of mass differences (np.ndarray) and
+                member indices (np.ndarray of shape (len(differences), 2)).
+        """
         lower_mass, upper_mass = self._determine_mass_range(mass, decimals=decimals)
+        mods = self._index("combo_mods")
+        masses = mods["sorted_mass"]
+        lower_index = np.searchsorted(masses, masses + lower_mass, side="left")
+        upper_index = np.searchsorted(masses, masses + upper_mass, side="right")
+        counts = np.maximum(upper_index - lower_index, 0)
+        starts = np.cumsum(counts) - counts
+        added = np.arange(counts.sum()) + np.repeat(lower_index - starts, counts)
+        subtracted = np.repeat(np.arange(len(masses)), counts)
+        members = np.column_stack(
+            [mods["sorted_order"][added], mods["sorted_order"][subtracted]]
+        ).astype(np.int32)
+        differences = mods["mass"][members[:, 0]] - mods["mass"][members[:, 1]]
+        # the searched bounds are sums, so the differences are checked again
+        keep = (
+            (members[:, 0] != members[:, 1])
+            & (lower_mass <= differences)
+            & (differences <= upper_mass)
+        )
+        members, differences = members[keep], differences[keep]
 
-        lower_index = bisect.bisect_left(
-            [x[0] for x in self._combos[n]],
-            lower_mass,
+        # sort by difference, ties by names, like the combos of mass_to_combos
+        name_ranks = np.unique(mods["mod_names"], return_inverse=True)[1]
+        order = np.lexsort(
+            [name_ranks[members[:, 1]], name_ranks[members[:, 0]], differences]
         )
+        if return_indices is True:
+            return differences[order], members[order]
+        return self._combos_to_tuples(differences[order], members[order])
+
+    def mass_to_peptide_combos(
+        self,
+        mass,
+        peptide,
+        n=2,
+        decimals=5,
+        n_term=True,
+        c_term=True,
+        classification=None,
+    ):
+        """Find combos of up to n mods that can be placed on a peptide together.
+
+        Only mods with a specificity for a residue of the peptide (or for an
+        enabled terminus) are combined, and every combo has to fit the peptide,
+        i.e. every mod is assigned to a position of its own, so that e.g. two
+        mods on K need two K in the peptide.
+
+        Args:
+            mass (float|int): combined mass
+            peptide (str): peptide sequence
+            n (int, optional): maximum number of mods to form the combined mass
+            decimals (int, optional): round to n decimal places
+            n_term (bool, optional): allow mods on the peptide N-terminus
+            c_term (bool, optional): allow mods on the peptide C-terminus
+            classification (str|list, optional): only consider specificities of
+                this classification (or one of these), e.g. "Post-translational"
+
+        Returns:
+            list: sorted list of tuples containing the combined mass and the names
+        """
+        capacities = {}
+        for residue in peptide.upper():
+            capacities[residue] = capacities.get(residue, 0) + 1
+        if n_term is True:
+            capacities["N-term"] = 1
+        if c_term is True:
+            capacities["C-term"] = 1
+
+        df = self.df
+        self._require_column(df, "Site", "peptide")
+        placeable = df["Site"].isin(list(capacities.keys()))
+        _, classifications = self._specificity_key(classification=classification)
+        if classifications is not None:
+            self._require_column(df, "Classification", "classification")
+            placeable &= df["Classification"].isin(classifications)
+        placeable = placeable.to_numpy(dtype=bool)
+        row_sites = self._index("column", "Site")
+        mod_sites = {}
+        row_mods = self._index("combo_mods")["row_mods"]
+        for mod, site in zip(row_mods[placeable], row_sites[placeable]):
+            mod_sites.setdefault(mod, set()).add(site)
+
+        placements = {}
+
+        def place(members, capacities):
+            if len(members) == 0:
+                return True
+            for site in mod_sites[members[0]]:
+                if capacities[site] > 0:
+                    capacities[site] -= 1
+                    placed = place(members[1:], capacities)
+                    capacities[site] += 1
+                    if placed:
+                        return True
+            return False
+
+        def accept(members):
+            if members not in placements:
+                placements[members] = place(members, dict(capacities))
+            return placements[members]
 
-        upper_index = bisect.bisect_right(
-            [x[0] for x in self._combos[n]],
-            upper_mass,
+        lower_mass, upper_mass = self._determine_mass_range(mass, decimals=decimals)
+        chunks = list(
+            self._iter_mass_combos(
+                lower_mass,
+                upper_mass,
+                n,
+                universe=sorted(mod_sites.keys()),
+                accept=accept,
+            )
         )
-        return self._combos[n][lower_index:upper_index]
+        combos = [combo for chunk in chunks for combo in self._combos_to_tuples(*chunk)]
+        return sorted(combos)
+
+    def _iter_mass_combos(
+        self, lower_mass, upper_mass, n, universe=None, accept=None, min_n=1
+    ):
+        """Find all multisets of up to n mods with a summed mass in a window.
+
+        This is a k-sum search over the sorted distinct mod masses: for every
+        prefix of chosen mods the range of the next mod is narrowed with binary
+        searches, using that the remaining mods can neither be lighter than
+        the next one nor heavier than the heaviest mod. The last two members
+        are resolved with vectorized searches.
+
+        Args:
+            lower_mass (float): lower bound of the summed mass (inclusive)
+            upper_mass (float): upper bound of the summed mass (inclusive)
+            n (int): maximum number of mods
+            universe (np.ndarray, optional): indices of the distinct mods to
+                combine, all distinct mods by default
+            accept (callable, optional): called with a sorted tuple of member
+                indices into the distinct mods, returns whether the multiset
+                (and so any multiset containing it) is allowed. Prefixes of
+                three and more mods are pruned with it, combos filtered.
+            min_n (int, optional): minimum number of mods
+
+        Yields:
+            tuple: combined masses (np.ndarray) and member indices into the
+                distinct mods (np.ndarray), one chunk per searched prefix
+        """
+        mods = self._index("combo_mods")
+        if universe is None:
+            order = mods["sorted_order"]
+            masses = mods["sorted_mass"]
+        else:
+            universe = np.asarray(universe, dtype=np.int64)
+            order = universe[np.argsort(mods["mass"][universe], kind="stable")]
+            order = order[~np.isnan(mods["mass"][order])]
+            masses = mods["mass"][order]
+        if len(masses) == 0:
+            return
+        max_mass = masses[-1]
+        # pruning bounds are widened by some slack to be safe against rounding,
+        # the final sums are checked exactly
+        slack = 1e-6
+
+        def to_chunk(totals, members):
+            # members are listed in table order, like in precomputed combos
+            members = np.sort(order[members], axis=1)
+            if accept is not None:
+                keep = np.fromiter(
+                    (accept(tuple(row)) for row in members.tolist()),
+                    dtype=bool,
+                    count=len(members),
+                )
+                totals, members = totals[keep], members[keep]
+            return totals, members.astype(np.int32)
+
+        def search(start, k, partial_sum, prefix):
+            if k == 1:
+                lower_index = max(
+                    start,
+                    np.searchsorted(masses, lower_mass - partial_sum - slack, "left"),
+                )
+                upper_index = np.searchsorted(
+                    masses, upper_mass - partial_sum + slack, "right"
+                )
+                last = np.arange(lower_index, upper_index)
+                totals = partial_sum + masses[last]
+                hits = (lower_mass <= totals) & (totals <= upper_mass)
+                members = np.column_stack(
+                    [np.tile(prefix, (hits.sum(), 1)), last[hits]]
+                ).astype(np.int64)
+                if hits.any():
+                    yield to_chunk(totals[hits], members)
+                return
+
+            lower_index = max(
+                start,
+                np.searchsorted(
+                    masses,
+                    lower_mass - partial_sum - (k - 1) * max_mass - slack,
+                    "left",
+                ),
+            )
+            upper_index = np.searchsorted(
+                masses, (upper_mass - partial_sum) / k + slack, "right"
+            )
+            if k > 2:
+                for i in range(lower_index, upper_index):
+                    if accept is not None and not accept(
+                        tuple(sorted(order[prefix + [i]].tolist()))
+                    ):
+                        continue
+                    yield from search(i, k - 1, partial_sum + masses[i], prefix + [i])
+                return
+
+            first = np.arange(lower_index, upper_index)
+            partial_sums = partial_sum + masses[first]
+            second_lower = np.maximum(
+                first,
+                np.searchsorted(masses, lower_mass - partial_sums - slack, "left"),
+            )
+            second_upper = np.searchsorted(
+                masses, upper_mass - partial_sums + slack, "right"
+            )
+            counts = np.maximum(second_upper - second_lower, 0)
+            offsets = np.cumsum(counts) - counts
+            second = np.arange(counts.sum()) + np.repeat(second_lower - offsets, counts)
+            first = np.repeat(first, counts)
+            totals = np.repeat(partial_sums, counts) + masses[second]
+            hits = (lower_mass <= totals) & (totals <= upper_mass)
+            members = np.column_stack(
+                [np.tile(prefix, (hits.sum(), 1)), first[hits], second[hits]]
+            ).astype(np.int64)
+            if hits.any():
+                yield to_chunk(totals[hits], members)
+
+        for k in range(min_n, n + 1):
+            for chunk in search(0, k, 0.0, []):
+                if len(chunk[0]) > 0:
+                    yield chunk
+
+    def _hill_notation(self, composition):
+        """Build the hill notation of a composition, e.g. C(2)H(2)O(1).
+
+        The notation is canonical and hashable, hence used as composition key.
+
+        Args:
+            composition (dict): chemical composition dict
+
+        Returns:
+            str: hill notation
+        """
+        MAJORS = ["C", "H"]
+        hill_notation = ""
+        for major in MAJORS:
+            if major in composition.keys():
+                hill_notation += "{0}({1})".format(major, composition[major])
+        for symbol, number in sorted(composition.items()):
+            if symbol in MAJORS:
+                continue
+            hill_notation += "{0}({1})".format(symbol, number)
+        return hill_notation
+
+    def _build_composition_index(self, df):
+        """Map every hill notation to the rows with that composition.
+
+        Args:
+            df (pd.DataFrame): unimod table
+
+        Returns:
+            dict: hill notation -> sorted array of row positions
+        """
+        if "hill_notation" in df.columns:
+            keys = df["hill_notation"]
+        else:
+            keys = df["elements"].map(
+                lambda elements: self._hill_notation(elements)
+                if isinstance(elements, dict)
+                else None
+            )
+        return keys.groupby(keys, sort=False).indices
+
+    def _composition_rows(self, composition):
+        """Get rows matching a composition.
+
+        Args:
+            composition (dict): chemical composition dict
+
+        Returns:
+            np.ndarray: row positions in table order
+        """
+        rows = self._index("composition").get(self._hill_notation(composition), None)
+        if rows is None:
+            return np.array([], dtype=np.int64)
+        return rows
 
     def composition_to_names(self, composition):
         """Get names for a given composition
@@ -321,8 +2070,8 @@ class UnimodMapper(object):
         Returns:
             list: list of names
         """
-        composition = dict(sorted(list(composition.items())))
-        return list(self.df.query("`elements` == @composition")["Name"].unique())
+        rows = self._composition_rows(composition)
+        return list(pd.unique(self._index("array", "Name")[rows]))
 
     def composition_to_ids(self, composition):
         """Get ids for a given composition
@@ -333,8 +2082,95 @@ class UnimodMapper(object):
         Returns:
             list: list of ids
         """
-        composition = dict(sorted(list(composition.items())))
-        return list(self.df.query("`elements` == @composition")["Accession"].unique())
+        rows = self._composition_rows(composition)
+        return list(pd.unique(self._index("array", "Accession")[rows]))
+
+    def composition_to_combos(self, composition, n=2):
+        """Find combos of up to n mods with exactly the given summed composition
+
+        The element counts of the distinct mods are hashed into 64-bit integers
+        (hashes of sums are sums of hashes) and every combo is split into two
+        halves; all halves of one size are hashed, sorted and searched for the
+        hash completing the other half (meet in the middle). Candidates are
+        checked on the element counts, so the result is exact. Halves of more
+        than two mods are too many to enumerate, i.e. n has to be at most 4.
+
+        Args:
+            composition (dict): chemical composition dict
+            n (int, optional): maximum number of mods to form the composition,
+                between 1 and 4
+
+        Returns:
+            list: list of tuples containing the combined mass and the names,
+                combos with fewer mods first and sorted by mass
+        """
+        if not 1 <= n <= 4:
+            raise ValueError(
+                f"n has to be between 1 and 4 for composition combos, got {n}"
+            )
+        combo_elements = self._index("combo_elements")
+        columns = {element: i for i, element in enumerate(combo_elements["elements"])}
+        target = np.zeros(len(columns), dtype=np.int64)
+        for element, count in composition.items():
+            if element not in columns.keys():
+                if count != 0:
+                    return []
+                continue
+            target[columns[element]] = count
+        counts = combo_elements["counts"].astype(np.int64)
+        target_hash = target.view(np.uint64) @ self._index("composition_hashes", 0)
+
+        mods = self._index("combo_mods")
+        combos = []
+        for k in range(1, n + 1):
+            right_hashes, right_members = self._index("composition_hashes", k - k // 2)
+            if k // 2 == 0:
+                left_hashes = np.zeros(1, dtype=np.uint64)
+                left_members = np.zeros((1, 0), dtype=np.int32)
+            else:
+                left_hashes, left_members = self._index("composition_hashes", k // 2)
+            missing = target_hash - left_hashes
+            lower_index = np.searchsorted(right_hashes, missing, side="left")
+            upper_index = np.searchsorted(right_hashes, missing, side="right")
+            matches = upper_index - lower_index
+            starts = np.cumsum(matches) - matches
+            right = np.arange(matches.sum()) + np.repeat(lower_index - starts, matches)
+            members = np.column_stack(
+                [
+                    np.repeat(left_members, matches, axis=0),
+                    right_members[right],
+                ]
+            )
+            # every multiset once, i.e. members in ascending order
+            members = members[np.all(members[:, 1:] >= members[:, :-1], axis=1)]
+            members = members[np.all(counts[members].sum(axis=1) == target, axis=1)]
+            masses = mods["mass"][members].sum(axis=1)
+            order = np.argsort(masses, kind="stable")
+            combos += self._combos_to_tuples(masses[order], members[order])
+        return combos
+
+    def _build_composition_hashes_index(self, df, size):
+        """Hashes of the summed element counts of all multisets of distinct mods.
+
+        Args:
+            df (pd.DataFrame): unimod table
+            size (int): number of mods per multiset, 0 for the hash weights
+
+        Returns:
+            np.ndarray|tuple: 64-bit hash weights per element for size 0, else
+                sorted hashes (np.ndarray) and the member indices into the
+                distinct mods (np.ndarray of shape (len(hashes), size))
+        """
+        elements = self._index("combo_elements")["elements"]
+        if size == 0:
+            rng = np.random.default_rng(len(elements))
+            return rng.integers(0, 2**63, len(elements), dtype=np.uint64) * 2 + 1
+        counts = self._index("combo_elements")["counts"].astype(np.int64)
+        mod_hashes = counts.view(np.uint64) @ self._index("composition_hashes", 0)
+        members = self._combination_indices(len(mod_hashes), size)
+        hashes = mod_hashes[members].sum(axis=1, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        return hashes[order], members[order]
 
     def composition_to_mass(self, composition):
         """Get mass for a given composition
@@ -345,8 +2181,8 @@ class UnimodMapper(object):
         Returns:
             float: mass
         """
-        composition = dict(sorted(list(composition.items())))
-        masses = list(self.df.query("`elements` == @composition")["mono_mass"].unique())
+        rows = self._composition_rows(composition)
+        masses = list(pd.unique(self._index("array", "mono_mass")[rows]))
         if len(masses) > 1:
             print(f"The Composition {composition} points to {masses} - Seriously!!")
             raise TypeError("We seriously have a problem with this XML")
@@ -355,23 +2191,248 @@ class UnimodMapper(object):
         else:
             return masses[0]
 
-    def _generate_mass_combos(self, n=2):
-        """Generate all mass combos of length n
+    def _combination_indices(self, n_items, n):
+        """Vectorized itertools.combinations_with_replacement(range(n_items), n).
+
+        Args:
+            n_items (int): number of items to combine
+            n (int): length of the combinations
+
+        Returns:
+            np.ndarray: int32 combinations of shape (number of combinations, n),
+                in the same (lexicographic) order as itertools
+        """
+        if n < 1:
+            raise ValueError(f"Combinations need at least one member, got n={n}")
+        if n == 2:
+            first, second = np.triu_indices(n_items)
+            return np.column_stack([first.astype(np.int32), second.astype(np.int32)])
+        members = np.arange(n_items, dtype=np.int32)[:, None]
+        for _ in range(n - 1):
+            # every combination is extended by all items >= its last item
+            last = members[:, -1].astype(np.int64)
+            counts = n_items - last
+            offsets = np.cumsum(counts) - counts
+            extension = np.arange(counts.sum()) + np.repeat(last - offsets, counts)
+            members = np.column_stack(
+                [np.repeat(members, counts, axis=0), extension.astype(np.int32)]
+            )
+        return members
+
+    def _build_combo_mods_index(self, df):
+        """Collect the distinct (mass, Name) pairs combos are formed of.
+
+        Args:
+            df (pd.DataFrame): unimod table
+
+        Returns:
+            dict: masses ("mass") and names ("mod_names") of the distinct mods,
+                masses without NaN in ascending order ("sorted_mass"), their
+                positions in the distinct mods ("sorted_order") and the distinct
+                mod of every row of the unimod table ("row_mods")
+        """
+        mods = df[["mono_mass", "Name"]].drop_duplicates()
+        mod_masses = mods["mono_mass"].to_numpy(dtype=float)
+        order = np.argsort(mod_masses, kind="stable")
+        order = order[~np.isnan(mod_masses[order])]
+        # groups are numbered in order of appearance, like the distinct mods
+        row_mods = (
+            df.groupby(["mono_mass", "Name"], sort=False, dropna=False)
+            .ngroup()
+            .to_numpy()
+        )
+        return {
+            "mass": mod_masses,
+            "mod_names": mods["Name"].to_numpy(dtype=object),
+            "sorted_mass": mod_masses[order],
+            "sorted_order": order,
+            "row_mods": row_mods,
+        }
+
+    def _build_combo_elements_index(self, df):
+        """Element count matrix of the distinct mods combos are formed of.
+
+        Args:
+            df (pd.DataFrame): unimod table
+
+        Returns:
+            dict: sorted element symbols ("elements") and the element counts
+                ("counts", np.ndarray of shape (distinct mods, elements)) of the
+                first row of every distinct mod
+        """
+        row_mods = self._index("combo_mods")["row_mods"]
+        first_rows = np.unique(row_mods, return_index=True)[1]
+        if "elements" in df.columns:
+            compositions = df["elements"].to_numpy()[first_rows]
+        else:
+            compositions = [{}] * len(first_rows)
+        compositions = [
+            composition if isinstance(composition, dict) else {}
+            for composition in compositions
+        ]
+        elements = sorted(set().union(*compositions))
+        columns = {element: i for i, element in enumerate(elements)}
+        counts = np.zeros((len(compositions), len(elements)), dtype=np.int32)
+        for i, composition in enumerate(compositions):
+            for element, count in composition.items():
+                counts[i, columns[element]] = count
+        return {"elements": elements, "counts": counts}
+
+    def _load_mass_combos(self, n=2, filter_key=None, combo_mass_range=None):
+        """Get the combo table of length n, shared across processes via disk.
+
+        Unfiltered combo tables of the unimod table built from the xml files
+        are stored in `cache_dir`, keyed by the source fingerprint and n, and
+        memory-mapped read-only, so every process maps the same file instead of
+        generating the table again. Tables for a filter or mass range are only
+        kept in memory, since every distinct filter would add another file.
 
         Args:
             n (int, optional): number of combinated mods
+            filter_key (tuple, optional): see `_combo_filter_key`
+            combo_mass_range (tuple, optional): see `_generate_mass_combos`
 
         Returns:
-            list: list of tuples with combined and single masses
-        """
-        mass_list = []
-        for combo in itertools.combinations_with_replacement(
-            self.df[["mono_mass", "Name"]].drop_duplicates().to_numpy(), 2
+            dict: combo table, see `_generate_mass_combos`
+        """
+        if (
+            self.use_cache is False
+            or self.df is not self._source_df
+            or self._source_df_fingerprint is None
+            or filter_key is not None
+            or combo_mass_range is not None
         ):
-            combo_mass = np.sum(np.fromiter((c[0] for c in combo), float))
-            combo_name = [c[1] for c in combo]
-            mass_list.append((combo_mass, combo_name))
-        return sorted(mass_list)
+            return self._generate_mass_combos(
+                n=n, filter_key=filter_key, combo_mass_range=combo_mass_range
+            )
+
+        prefix = f"combos_{self._source_df_fingerprint}_n{n}"
+        paths = {
+            key: self.cache_dir / f"{prefix}_{key}.npy" for key in ["mass", "members"]
+        }
+        if all(path.exists() for path in paths.values()):
+            try:
+                combos = {
+                    key: np.load(path, mmap_mode="r", allow_pickle=False)
+                    for key, path in paths.items()
+                }
+                logger.debug(f"Mapped combo table from {self.cache_dir} ({prefix})")
+                return combos
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring broken combo table {prefix}: {e}")
+
+        combos = self._generate_mass_combos(n=n)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for key, path in paths.items():
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, "wb") as combo_file:
+                    np.save(combo_file, combos[key])
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write combo table {prefix}: {e}")
+            return combos
+        return {
+            key: np.load(path, mmap_mode="r", allow_pickle=False)
+            for key, path in paths.items()
+        }
+
+    def _generate_mass_combos(self, n=2, filter_key=None, combo_mass_range=None):
+        """Generate all mass combos of length n
+
+        Args:
+            n (int, optional): number of combinated mods
+            filter_key (tuple, optional): only combine the mods passing this
+                filter, see `_combo_filter_key`
+            combo_mass_range (tuple, optional): only generate combos with a
+                combined mass within these bounds (inclusive). Combos are then
+                enumerated on the sorted mod masses, so memory and time scale
+                with the number of combos in the range.
+
+        Returns:
+            dict: combo table with the summed masses ("mass", sorted float64
+                np.ndarray) and the int32 indices of the combined mods into the
+                distinct mods ("members", np.ndarray of shape (len(mass), n))
+        """
+        mods = self._index("combo_mods")
+        mod_masses = mods["mass"]
+        universe = self._combo_universe(filter_key)
+        if combo_mass_range is not None:
+            members = self._mass_range_combos(
+                n, combo_mass_range[0], combo_mass_range[1], universe
+            )
+        elif universe is None:
+            members = self._combination_indices(len(mod_masses), n)
+        else:
+            members = universe.astype(np.int32)[
+                self._combination_indices(len(universe), n)
+            ]
+        masses = mod_masses[members[:, 0]]
+        for i in range(1, n):
+            masses = masses + mod_masses[members[:, i]]
+        if combo_mass_range is not None:
+            # sums in table order may round differently than during the search
+            in_range = (combo_mass_range[0] <= masses) & (masses <= combo_mass_range[1])
+            masses, members = masses[in_range], members[in_range]
+
+        # sort by mass, ties by names, i.e. like sorting (mass, [names]) tuples
+        name_ranks = np.unique(mods["mod_names"], return_inverse=True)[1]
+        order = np.lexsort(
+            [name_ranks[members[:, i]] for i in reversed(range(n))] + [masses]
+        )
+        return {"mass": masses[order], "members": members[order]}
+
+    def _mass_range_combos(self, n, lower_mass, upper_mass, universe=None):
+        """Enumerate the combos of length n within a mass range.
+
+        Pairs are enumerated directly: for every mod the partners completing a
+        sum within the range are a slice of the sorted mod masses. Longer combos
+        are searched with `_iter_mass_combos`.
+
+        Args:
+            n (int): number of combinated mods
+            lower_mass (float): lower bound of the combined mass (inclusive)
+            upper_mass (float): upper bound of the combined mass (inclusive)
+            universe (np.ndarray, optional): indices of the distinct mods to
+                combine, all distinct mods by default
+
+        Returns:
+            np.ndarray: int32 member indices into the distinct mods, in table
+                order, of shape (number of combos, n). The sums of some
+                members may be outside the range by rounding.
+        """
+        if n != 2:
+            members = [
+                chunk_members
+                for _, chunk_members in self._iter_mass_combos(
+                    lower_mass, upper_mass, n, universe=universe, min_n=n
+                )
+            ]
+            if len(members) == 0:
+                return np.zeros((0, n), dtype=np.int32)
+            return np.concatenate(members)
+
+        mods = self._index("combo_mods")
+        if universe is None:
+            order = mods["sorted_order"]
+            masses = mods["sorted_mass"]
+        else:
+            order = universe[np.argsort(mods["mass"][universe], kind="stable")]
+            order = order[~np.isnan(mods["mass"][order])]
+            masses = mods["mass"][order]
+        # some slack against rounding, the sums are checked by the caller
+        slack = 1e-6
+        second_lower = np.maximum(
+            np.arange(len(masses)),
+            np.searchsorted(masses, lower_mass - masses - slack, "left"),
+        )
+        second_upper = np.searchsorted(masses, upper_mass - masses + slack, "right")
+        counts = np.maximum(second_upper - second_lower, 0)
+        starts = np.cumsum(counts) - counts
+        second = np.arange(counts.sum()) + np.repeat(second_lower - starts, counts)
+        first = np.repeat(np.arange(len(masses)), counts)
+        members = np.column_stack([order[first], order[second]])
+        return np.sort(members, axis=1).astype(np.int32)
 
     def _extract_elements(self, element):
         """Extract xml elements with the name 'element'.
@@ -391,79 +2452,179 @@ class UnimodMapper(object):
         r_dict = dict(sorted(list(r_dict.items())))
         return r_dict
 
+    def _parse_xml_records(self, xml_file_list):
+        """Parse unimod xml files into normalized records.
+
+        Every file is walked exactly once, both `data_list` and `df` are derived
+        from the returned records. Missing files are skipped silently, callers
+        decide how to report them.
+
+        Args:
+            xml_file_list (list): list of unimod xml files
+
+        Returns:
+            list: list of dicts, one record per mod
+        """
+        records = []
+        for xml_file in xml_file_list:
+            xml_path = Path(xml_file)
+            if xml_path.exists() is False:
+                continue
+            logger.info("Parsing mod xml file ({0})".format(xml_path))
+            with open(xml_path, "rb") as xml_handle:
+                records.extend(self._iter_xml_records(xml_handle))
+        return records
+
+    def _iter_xml_records(self, xml_handle):
+        """Stream the mods of a single unimod xml file.
+
+        Processed elements are cleared right away, so memory stays bounded
+        by the size of a single mod rather than the size of the file.
+
+        Args:
+            xml_handle (file): binary file handle of the xml
+
+        Yields:
+            dict: record with the raw information of a mod
+        """
+        modifications = None
+        for event, element in ET.iterparse(xml_handle, events=("start", "end")):
+            if event == "start":
+                if element.tag.endswith("}mod"):
+                    record = {
+                        "record_id": str(element.attrib.get("record_id", "")),
+                        "title": element.attrib["title"],
+                        "full_name": element.attrib.get("full_name", ""),
+                        "approved": element.attrib.get("approved", "0"),
+                        "elements": {},
+                        "specificity": [],
+                    }
+                elif element.tag.endswith("}delta"):
+                    record["mono_mass"] = float(element.attrib["mono_mass"])
+                elif element.tag.endswith("}modifications"):
+                    modifications = element
+            else:
+                if element.tag.endswith("}delta"):
+                    for sub_element in element.iter():
+                        if sub_element.tag.endswith("}element"):
+                            number = int(sub_element.attrib["number"])
+                            if number != 0:
+                                record["elements"][sub_element.attrib["symbol"]] = number
+                elif element.tag.endswith("}alt_name"):
+                    record["alt_name"] = element.text
+                elif element.tag.endswith("}specificity"):
+                    neutral_losses = []
+                    for sub_element in element.iter():
+                        if sub_element.tag.endswith("}NeutralLoss"):
+                            neutral_loss_elements = None
+                            if len(sub_element) > 0:
+                                neutral_loss_elements = self._extract_elements(
+                                    sub_element
+                                )
+                            neutral_losses.append(
+                                {
+                                    "mono_mass": sub_element.attrib["mono_mass"],
+                                    "composition": sub_element.attrib.get(
+                                        "composition", ""
+                                    ),
+                                    "elements": neutral_loss_elements,
+                                }
+                            )
+                    record["specificity"].append(
+                        {
+                            "site": element.attrib["site"],
+                            "classification": element.attrib["classification"],
+                            "neutral_losses": neutral_losses,
+                        }
+                    )
+                elif element.tag.endswith("}mod"):
+                    yield record
+                    element.clear()
+                    if modifications is not None:
+                        del modifications[:]
+                elif element.tag.endswith(("}elements", "}amino_acids", "}mod_bricks")):
+                    element.clear()
+
+    def _record_to_detail_dict(self, record):
+        """Convert a record into a row (before exploding specificities) of `df`.
+
+        Args:
+            record (dict): record as returned by `_iter_xml_records`
+
+        Returns:
+            dict: information regarding a unimod
+        """
+        tmp = {
+            "Name": record["title"],
+            "Accession": record["record_id"],
+            "Description": record["full_name"],
+            "elements": dict(sorted(record["elements"].items())),
+            "specificity": [],
+            "PSI-MS approved": False,
+        }
+        if record["approved"] == "1":
+            tmp["PSI-MS approved"] = True
+            tmp["PSI-MS Name"] = record["title"]
+        if "mono_mass" in record.keys():
+            tmp["mono_mass"] = record["mono_mass"]
+        if "alt_name" in record.keys():
+            tmp["Alt Description"] = record["alt_name"]
+        for specificity in record["specificity"]:
+            if specificity["classification"] == "Artefact":
+                continue
+            neutral_loss_elements = {}
+            neutral_loss_mass = 0
+            for neutral_loss in specificity["neutral_losses"]:
+                if neutral_loss["elements"] is not None:
+                    neutral_loss_elements = neutral_loss["elements"]
+                    neutral_loss_mass = float(neutral_loss["mono_mass"])
+            tmp["specificity"].append(
+                f"{specificity['site']}<|>{specificity['classification']}<|>{neutral_loss_elements}<|>{neutral_loss_mass}"
+            )
+        return tmp
+
+    def _record_to_data_dict(self, record):
+        """Convert a record into an entry of the legacy `data_list`.
+
+        Args:
+            record (dict): record as returned by `_iter_xml_records`
+
+        Returns:
+            dict: information regarding a unimod
+        """
+        data_dict = {
+            "unimodID": record["record_id"],
+            "unimodname": record["title"],
+            "element": dict(record["elements"]),
+            "specificity": [],
+            "neutral_loss": [],
+        }
+        if "mono_mass" in record.keys():
+            data_dict["mono_mass"] = record["mono_mass"]
+        for specificity in record["specificity"]:
+            if specificity["classification"] != "Artefact":
+                data_dict["specificity"].append(
+                    (specificity["site"], specificity["classification"])
+                )
+            for neutral_loss in specificity["neutral_losses"]:
+                composition = neutral_loss["composition"]
+                if composition and composition != "0" and data_dict["specificity"]:
+                    amino_acid = data_dict["specificity"][-1][0]
+                    data_dict["neutral_loss"].append(
+                        (amino_acid, neutral_loss["mono_mass"])
+                    )
+        return data_dict
+
     def _parse_in_more_detail_XML(self):
         """Parse unimod xml.
 
         Returns:
             list: list of dicts with information regarding a unimod
         """
-        data_list = []
         for xml_path in self.unimod_xml_names:
-            xml_path = Path(xml_path)
-            if os.path.exists(xml_path) is False:
+            if Path(xml_path).exists() is False:
                 logger.warning(f"{xml_path} does not exist")
-                continue
-
-            logger.info("Parsing mod xml file ({0})".format(xml_path))
-            unimodXML = ET.iterparse(
-                codecs.open(xml_path, "r", encoding="utf8"),
-                events=(b"start", b"end"),
-            )
-            for event, element in unimodXML:
-                if event == b"start":
-                    if element.tag.endswith("}mod"):
-                        tmp = {
-                            "Name": element.attrib["title"],
-                            "Accession": str(element.attrib.get("record_id", "")),
-                            "Description": element.attrib.get("full_name", ""),
-                            "elements": {},
-                            "specificity": [],
-                            "PSI-MS approved": False,
-                        }
-                        if element.attrib.get("approved", "0") == "1":
-                            tmp["PSI-MS approved"] = True
-                            tmp["PSI-MS Name"] = element.attrib["title"]
-                    elif element.tag.endswith("}delta"):
-                        tmp["mono_mass"] = float(element.attrib["mono_mass"])
-                    elif element.tag.endswith("}alt_name"):
-                        tmp["Alt Description"] = element.text
-                    else:
-                        pass
-                else:
-                    # end mod
-
-                    if element.tag.endswith("}delta"):
-                        tmp["elements"] = self._extract_elements(element)
-
-                    elif element.tag.endswith("}specificity"):
-                        amino_acid = element.attrib["site"]
-                        classification = element.attrib["classification"]
-                        if classification == "Artefact":
-                            continue
-
-                        neutral_loss_elements = {}
-                        neutral_loss_mass = 0
-                        if len(element) > 0:
-                            for sub_element in element.iter():
-                                if (
-                                    sub_element.tag.endswith("}NeutralLoss")
-                                    and len(sub_element) > 0
-                                ):
-                                    neutral_loss_elements = self._extract_elements(
-                                        sub_element
-                                    )
-                                    neutral_loss_mass = float(
-                                        sub_element.attrib["mono_mass"]
-                                    )
-                        tmp["specificity"].append(
-                            f"{amino_acid}<|>{classification}<|>{neutral_loss_elements}<|>{neutral_loss_mass}"
-                        )
-
-                    elif element.tag.endswith("}mod"):
-                        data_list.append(tmp)
-                    else:
-                        pass
-        return data_list
+        return [self._record_to_detail_dict(record) for record in self.records]
 
     def _parseXML(self, xml_file_list=None):
         """Parse unimod xml.
@@ -473,73 +2634,26 @@ class UnimodMapper(object):
         """
         if xml_file_list is None:
             xml_file_list = []
-        data_list = []
         for xml_file in xml_file_list:
             xml_path = Path(xml_file)
             if xml_path.exists():
-                logger.debug("Parsing mods file ({0})".format(xml_path))
-                unimodXML = ET.iterparse(
-                    codecs.open(xml_path, "r", encoding="utf8"),
-                    events=(b"start", b"end"),
-                )
-                collect_element = False
-                for event, element in unimodXML:
-                    if event == b"start":
-                        if element.tag.endswith("}mod"):
-                            try:
-                                unimodid = element.attrib["record_id"]
-                            except KeyError:
-                                unimodid = ""
-                            tmp = {
-                                "unimodID": unimodid,
-                                "unimodname": element.attrib["title"],
-                                "element": {},
-                                "specificity": [],
-                                "neutral_loss": [],
-                            }
-                        elif element.tag.endswith("}delta"):
-                            collect_element = True
-                            tmp["mono_mass"] = float(element.attrib["mono_mass"])
-                        elif element.tag.endswith("}element"):
-                            if collect_element is True:
-                                number = int(element.attrib["number"])
-                                if number != 0:
-                                    tmp["element"][element.attrib["symbol"]] = number
-                        elif element.tag.endswith("}specificity"):
-                            amino_acid = element.attrib["site"]
-                            classification = element.attrib["classification"]
-                            if classification != "Artefact":
-                                tmp["specificity"].append((amino_acid, classification))
-                        elif element.tag.endswith("}NeutralLoss"):
-                            if (
-                                element.attrib["composition"]
-                                and element.attrib["composition"] != "0"
-                                and tmp["specificity"]
-                            ):
-                                amino_acid = tmp["specificity"][-1][0]
-                                neutral_loss = element.attrib["mono_mass"]
-                                tmp["neutral_loss"].append((amino_acid, neutral_loss))
-                    else:
-                        # end element
-                        if element.tag.endswith("}delta"):
-                            collect_element = False
-                        elif element.tag.endswith("}mod"):
-                            data_list.append(tmp)
-                        else:
-                            pass
+                continue
+            if xml_path.name == "unimod.xml":
+                logger.warning(f"No unimod.xml file found. Expected at {xml_path}")
+                # at least unimod.xml HAS to be available!
+                print(xml_path)
+                sys.exit(1)
+            elif xml_path.name == "usermod.xml":
+                logger.debug(f"No usermod.xml file found. Expected at {xml_path}")
             else:
-                if xml_path.name == "unimod.xml":
-                    logger.warning(f"No unimod.xml file found. Expected at {xml_path}")
-                    # at least unimod.xml HAS to be available!
-                    print(xml_path)
-                    sys.exit(1)
-                elif xml_path.name == "usermod.xml":
-                    logger.debug(f"No usermod.xml file found. Expected at {xml_path}")
-                    continue
-                else:
-                    logger.warning(f"Specified file not found. Expected at {xml_path}")
-                    sys.exit(1)
-        return data_list
+                logger.warning(f"Specified file not found. Expected at {xml_path}")
+                sys.exit(1)
+
+        if list(xml_file_list) == list(self.unimod_xml_names):
+            records = self.records
+        else:
+            records = self._parse_xml_records(xml_file_list)
+        return [self._record_to_data_dict(record) for record in records]
 
     def _initialize_mapper(self):
         """Set up the mapper and generate the index dict."""
@@ -552,18 +2666,7 @@ class UnimodMapper(object):
 
             for key, value in unimod_data_dict.items():
                 if key == "element":
-                    MAJORS = ["C", "H"]
-                    hill_notation = ""
-                    for major in MAJORS:
-                        if major in unimod_data_dict[key].keys():
-                            hill_notation += "{0}({1})".format(
-                                major, unimod_data_dict[key][major]
-                            )
-                    for symbol, number in sorted(unimod_data_dict[key].items()):
-                        if symbol in MAJORS:
-                            continue
-                        hill_notation += "{0}({1})".format(symbol, number)
-
+                    hill_notation = self._hill_notation(unimod_data_dict[key])
                     if hill_notation not in mapper.keys():
                         mapper[hill_notation] = []
                     mapper[hill_notation].append(index)
@@ -1168,6 +3271,15 @@ class UnimodMapper(object):
         return
 
     def _reparseXML(self, xml_file_list=[]):
+        # the xml files changed, drop everything parsed or derived from them
+        self._records = None
+        if self._df is self._source_df:
+            self._df = None
+        self._source_df = None
+        self._source_df_fingerprint = None
+        self._indexes = {}
+        self._indexed_df = None
+        self._combos.clear()
         self._data_list = self._parseXML(xml_file_list=xml_file_list)
         self._mapper = self._initialize_mapper()
 
@@ -1337,6 +3449,11 @@ class UnimodMapper(object):
                             mod,
                         )
                     )
+                    combos = self.composition_to_combos(composition, n=2)
+                    if len(combos) > 0:
+                        logger.info(
+                            f"The chemical composition of '{unimod_name}' equals the combined composition of Unimod modifications: {[names for _, names in combos]}"
+                        )
                     from chemical_composition import ChemicalComposition
 
                     cc_string = "+" + "".join(